@@ -0,0 +1,183 @@
+"""Structured, non-blocking logging for the agent.
+
+Log records are rendered as one JSON object per line. Producers only put the
+record on a bounded queue; a QueueListener thread does the actual stdout
+writes, so a slow or flooded stdout never blocks the event loop. uvicorn's own
+loggers are routed through the same queue. Each message template is rate
+limited per level, and records carry the correlation id of the /meta/*
+request that caused them; INFO traces of a request are sampled per correlation
+id rather than rate limited, so a request's trace is kept or dropped as a whole.
+"""
+import copy
+import hashlib
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+# Set per /meta/* request; copied into every record logged while handling it
+correlation_id: ContextVar[Optional[str]] = ContextVar("correlation_id", default=None)
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "correlation_id", "suppressed"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Render a record, including its `extra` fields, as a single JSON line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "correlation_id", None):
+            entry["correlation_id"] = record.correlation_id
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class CorrelationFilter(logging.Filter):
+    """Stamp records with the correlation id of the current context"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per (logger, message template, level)
+
+    Each template may burst up to `burst` records and then `rate` records per
+    second. Dropped records are counted and reported on the next one let through.
+    Warnings and errors are limited too, since error storms are the case this
+    protects against. INFO and DEBUG records that carry a correlation id are
+    request traces: instead of the buckets, a `trace_sample_rate` share of
+    correlation ids is kept, with every record of a kept request.
+    """
+
+    def __init__(self, rate: float = 5.0, burst: int = 50, trace_sample_rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.trace_sample_rate = trace_sample_rate
+        self._buckets: Dict[Tuple[str, str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def sampled(self, request_id: str) -> bool:
+        """Stable per-request decision, so a trace is never left with gaps"""
+        if self.trace_sample_rate >= 1:
+            return True
+        digest = hashlib.md5(request_id.encode()).digest()
+        return int.from_bytes(digest[:8], "big") / 2**64 < self.trace_sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        request_id = getattr(record, "correlation_id", None)
+        if request_id and record.levelno <= logging.INFO:
+            return self.sampled(request_id)
+
+        key = (record.name, str(record.msg), record.levelno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            tokens, last, suppressed = bucket
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                bucket[:] = [tokens, now, suppressed + 1]
+                return False
+            bucket[:] = [tokens - 1, now, 0]
+        record.suppressed = suppressed
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Resolve the message but keep the traceback separate from it
+
+        The stock prepare() formats the traceback into msg; here msg stays the
+        message alone and the traceback goes to exc_text, which the JSON
+        formatter emits as its own field.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            # Traceback objects keep frames alive while the record sits in the queue
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def setup_logging(level: int = logging.INFO, rate: float = 5.0, burst: int = 50, max_queue: int = 10000,
+                  trace_sample_rate: float = 1.0):
+    """Route all logging through a background JSON writer; safe to call more than once"""
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue: queue.Queue = queue.Queue(maxsize=max_queue)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(CorrelationFilter())
+    queue_handler.addFilter(RateLimitFilter(rate=rate, burst=burst, trace_sample_rate=trace_sample_rate))
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+
+    # uvicorn installs synchronous stdout handlers of its own; send its records through the queue too
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        server_logger = logging.getLogger(name)
+        server_logger.handlers = []
+        server_logger.propagate = True
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread
+
+    Records logged afterwards (e.g. uvicorn reporting a failed startup or the
+    end of shutdown) are written synchronously by the same JSON stream handler.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        root = logging.getLogger()
+        root.handlers = list(_listener.handlers)
+        for handler in root.handlers:
+            handler.addFilter(CorrelationFilter())
+        _listener = None
@@ -1,48 +1,61 @@
 import asyncio
+import copy
+import functools
+import hashlib
+import logging
 import os
 import json
 import time
 import sys
-from datetime import datetime
-from typing import Any, Dict
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+import anyio
 import httpx
 import requests
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 
 # Handle imports for both standalone and module execution
 try:
-    from .meta_client import MetaAPIClient
+    from .meta_client import MetaAPIClient, config_paths, find_config_path
+    from .rollups import DailyRollup, ROLLUP_FIELDS
+    from .sharding import HashRing, normalize_account_id
+    from .scheduler import MetaScheduler, Priority
+    from .logging_setup import correlation_id, setup_logging, shutdown_logging
 except ImportError:
     # If relative import fails, try absolute import
     sys.path.insert(0, str(Path(__file__).parent))
-    from meta_client import MetaAPIClient
+    from meta_client import MetaAPIClient, config_paths, find_config_path
+    from rollups import DailyRollup, ROLLUP_FIELDS
+    from sharding import HashRing, normalize_account_id
+    from scheduler import MetaScheduler, Priority
+    from logging_setup import correlation_id, setup_logging, shutdown_logging
+
+logger = logging.getLogger(__name__)
 
 
 # Load configuration from JSON file
 def load_config():
     # Try multiple config paths for different execution contexts
-    config_paths = [
-        '/app/config/meta_config.json',  # Docker
-        str(Path(__file__).parent.parent / 'config' / 'meta_config.json'),  # Local development
-        'config/meta_config.json',  # Current directory
-    ]
-    
-    for config_path in config_paths:
+    for config_path in config_paths():
         try:
             with open(config_path, 'r') as f:
                 config = json.load(f)
-                print(f"Loaded config from: {config_path}")
+                logger.debug("Loaded config from %s", config_path)
                 return config
         except FileNotFoundError:
             continue
     
     # Fallback to environment variables
-    print("Config file not found, using environment variables")
+    logger.debug("Config file not found, using environment variables")
     return {
         "meta_api": {
             "app_id": os.getenv("META_APP_ID"),
@@ -62,17 +75,36 @@ def load_config():
         }
     }
 
-config = load_config()
-
-# Get CRM base URL - prefer config, then env var, then default to localhost
-CRM_BASE_URL = config.get("crm", {}).get("base_url") or os.getenv("CRM_BASE_URL", "http://localhost:8000")
-AGENT_ID = config.get("agent", {}).get("id") or config.get("crm", {}).get("agent_id") or os.getenv("AGENT_ID", "agt_dev")
-AGENT_TOKEN = config.get("agent", {}).get("token") or config.get("crm", {}).get("agent_token") or os.getenv("AGENT_TOKEN")
+# Populated by init_config() during startup - nothing is read from disk at import time
+config: Dict[str, Any] = {}
+CRM_BASE_URL = os.getenv("CRM_BASE_URL", "http://localhost:8000")
+AGENT_ID = os.getenv("AGENT_ID", "agt_dev")
+AGENT_TOKEN = os.getenv("AGENT_TOKEN")
 
 # Global variables that can be updated when config changes
 current_agent_id = AGENT_ID
 current_agent_token = AGENT_TOKEN
 
+# Ad accounts assigned to this agent, as returned by config:pull
+current_ad_accounts: list[Dict[str, Any]] = []
+
+def init_config() -> bool:
+    """Load the agent config and resolve CRM URL and agent credentials"""
+    global config, CRM_BASE_URL, AGENT_ID, AGENT_TOKEN, current_agent_id, current_agent_token
+    config = load_config()
+    
+    # Get CRM base URL - prefer config, then env var, then default to localhost
+    CRM_BASE_URL = config.get("crm", {}).get("base_url") or os.getenv("CRM_BASE_URL", "http://localhost:8000")
+    AGENT_ID = config.get("agent", {}).get("id") or config.get("crm", {}).get("agent_id") or os.getenv("AGENT_ID", "agt_dev")
+    AGENT_TOKEN = config.get("agent", {}).get("token") or config.get("crm", {}).get("agent_token") or os.getenv("AGENT_TOKEN")
+    
+    current_agent_id = AGENT_ID
+    current_agent_token = AGENT_TOKEN
+    if not current_agent_id or not current_agent_token:
+        logger.error("Invalid credentials", extra={"agent_id": current_agent_id, "token_set": bool(current_agent_token)})
+        return False
+    return True
+
 def reload_config():
     global current_agent_id, current_agent_token
     try:
@@ -82,24 +114,21 @@ def reload_config():
         
         # Validate credentials
         if not current_agent_id or not current_agent_token:
-            print(f"ERROR: Invalid credentials - agent_id='{current_agent_id}', token={'EMPTY' if not current_agent_token else 'SET'}")
+            logger.error("Invalid credentials", extra={"agent_id": current_agent_id, "token_set": bool(current_agent_token)})
             return False
             
-        print(f"Config reloaded: agent_id={current_agent_id}, token={'*' * len(current_agent_token)}")
+        logger.debug("Config reloaded", extra={"agent_id": current_agent_id})
         return True
     except Exception as e:
-        print(f"Failed to reload config: {e}")
+        logger.error("Failed to reload config: %s", e)
         return False
 
 
-app = FastAPI(title="SM Agent", version="0.1.0")
-
 # Secret management - use /etc/sm-agent in Docker, ./secrets locally
 if os.path.exists("/etc/sm-agent"):
     SECRETS_DIR = Path("/etc/sm-agent")
 else:
     SECRETS_DIR = Path(__file__).parent.parent / "secrets"
-SECRETS_DIR.mkdir(exist_ok=True, parents=True)
 
 class CredentialManager:
     def __init__(self):
@@ -114,7 +143,7 @@ class CredentialManager:
                 with open(cred_file, 'r') as f:
                     self.credentials[account_id] = json.load(f)
             except Exception as e:
-                print(f"Failed to load credentials for {account_id}: {e}")
+                logger.error("Failed to load credentials for %s: %s", account_id, e)
     
     def get_credentials(self, account_id: str) -> Dict[str, Any]:
         """Get credentials for a specific account"""
@@ -127,31 +156,116 @@ class CredentialManager:
             try:
                 with open(cred_file, 'r') as f:
                     self.credentials[account_id] = json.load(f)
-                print(f"Reloaded credentials for {account_id}")
+                logger.info("Reloaded credentials for %s", account_id)
             except Exception as e:
-                print(f"Failed to reload credentials for {account_id}: {e}")
-
-cred_manager = CredentialManager()
-
-# Initialize Meta API client
-# Try multiple config paths
-config_paths = [
-    '/app/config/meta_config.json',  # Docker
-    str(Path(__file__).parent.parent / 'config' / 'meta_config.json'),  # Local development
-    'config/meta_config.json',  # Current directory
-]
-
-meta_config_path = None
-for path in config_paths:
-    if os.path.exists(path):
-        meta_config_path = path
-        break
-
-if meta_config_path:
-    meta_client = MetaAPIClient(config_path=meta_config_path)
-else:
-    # Fallback: create client with default path (will use env vars)
-    meta_client = MetaAPIClient(config_path="config/meta_config.json")
+                logger.error("Failed to reload credentials for %s: %s", account_id, e)
+
+def init_credentials() -> CredentialManager:
+    SECRETS_DIR.mkdir(exist_ok=True, parents=True)
+    return CredentialManager()
+
+# Subsystems created during startup (see lifespan below)
+cred_manager: CredentialManager | None = None
+meta_client: MetaAPIClient | None = None
+observer: Observer | None = None
+scheduler: MetaScheduler | None = None
+
+def account_access_token(account_id: str) -> str | None:
+    """Access token from the account's .creds file, if one has been provisioned"""
+    account_id = normalize_account_id(account_id)
+    creds = cred_manager.get_credentials(account_id) or cred_manager.get_credentials(f"act_{account_id}")
+    return creds.get("access_token")
+
+def get_meta_client(account_id: str | None = None) -> MetaAPIClient:
+    """Get the Meta API client for an ad account (default: the configured one)
+    
+    The token is looked up on every call so reloaded credentials apply immediately.
+    Raises ValueError for an account without credentials rather than falling back
+    to the default account's token.
+    """
+    if not account_id or normalize_account_id(account_id) == normalize_account_id(meta_client.ad_account_id):
+        return meta_client
+    account_id = normalize_account_id(account_id)
+    access_token = account_access_token(account_id)
+    if not access_token:
+        logger.warning("No credentials for ad account %s", account_id)
+        raise ValueError(f"No credentials for ad account {account_id}")
+    client = copy.copy(meta_client)
+    client.ad_account_id = account_id
+    client.access_token = access_token
+    return client
+
+# Sharding - set when this process runs as a worker under the supervisor (run.py --workers N)
+WORKER_ID = os.getenv("AGENT_WORKER_ID")
+SUPERVISOR_URL = os.getenv("AGENT_SUPERVISOR_URL")
+worker_ring: HashRing | None = None
+# Bumped whenever ring membership changes, so sync loops pick up moved accounts right away
+ring_version = 0
+
+# How often workers poll the ring; matches the supervisor's health-check interval
+RING_REFRESH_SECONDS = 2.0
+
+async def refresh_worker_ring(client: httpx.AsyncClient):
+    """Fetch the current ring membership from the supervisor"""
+    global worker_ring, ring_version
+    if not WORKER_ID:
+        return
+    try:
+        resp = await client.get(f"{SUPERVISOR_URL}/cluster/ring", timeout=5.0)
+        if resp.is_success:
+            ring = resp.json()
+            if worker_ring is None or set(ring["workers"]) != worker_ring.nodes:
+                worker_ring = HashRing(ring["workers"], replicas=ring["replicas"])
+                ring_version += 1
+                logger.info("Worker ring changed", extra={"workers": sorted(worker_ring.nodes)})
+    except Exception as e:
+        logger.warning("Failed to refresh worker ring: %s", e)
+
+async def ring_refresh_loop():
+    """Track ring membership continuously instead of once per sync round"""
+    async with httpx.AsyncClient() as client:
+        while True:
+            await refresh_worker_ring(client)
+            await asyncio.sleep(RING_REFRESH_SECONDS)
+
+async def wait_for_ring_membership(timeout: float = 60.0) -> bool:
+    """Wait until this worker is in the ring; a worker outside it would own nothing"""
+    if not WORKER_ID:
+        return True
+    deadline = time.monotonic() + timeout
+    while worker_ring is None or WORKER_ID not in worker_ring.nodes:
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(RING_REFRESH_SECONDS / 2)
+    return True
+
+async def wait_for_next_round(interval: float, seen_ring_version: int):
+    """Sleep until the next sync round, waking early when the ring changes"""
+    deadline = time.monotonic() + interval
+    while ring_version == seen_ring_version and time.monotonic() < deadline:
+        await asyncio.sleep(min(RING_REFRESH_SECONDS, deadline - time.monotonic()))
+
+def owned_account_ids() -> list[str]:
+    """Ad accounts this process is responsible for syncing"""
+    account_ids = [normalize_account_id(meta_client.ad_account_id)]
+    for account in current_ad_accounts:
+        account_id = normalize_account_id(account.get("meta_ad_account_id", ""))
+        if not account_id or account_id in account_ids:
+            continue
+        if not account_access_token(account_id):
+            logger.warning("Skipping ad account %s without credentials", account_id)
+            continue
+        account_ids.append(account_id)
+    if not WORKER_ID:
+        return account_ids
+    if worker_ring is None:
+        return []
+    return [account_id for account_id in account_ids if worker_ring.get(account_id) == WORKER_ID]
+
+def due_account_ids(last_synced: Dict[str, float], interval: float) -> list[str]:
+    """Owned accounts not synced within the last interval, e.g. just moved to this worker"""
+    now = time.monotonic()
+    return [account_id for account_id in owned_account_ids() if now - last_synced.get(account_id, float("-inf")) >= interval]
 
 class CredentialFileHandler(FileSystemEventHandler):
     def on_modified(self, event):
@@ -159,10 +273,11 @@ class CredentialFileHandler(FileSystemEventHandler):
             account_id = Path(event.src_path).stem
             cred_manager.reload_credentials(account_id)
 
-# Start file watcher
-observer = Observer()
-observer.schedule(CredentialFileHandler(), str(SECRETS_DIR), recursive=False)
-observer.start()
+def start_credential_watcher() -> Observer:
+    watcher = Observer()
+    watcher.schedule(CredentialFileHandler(), str(SECRETS_DIR), recursive=False)
+    watcher.start()
+    return watcher
 
 
 async def post(client: httpx.AsyncClient, path: str, json: Dict[str, Any] | None = None) -> httpx.Response:
@@ -177,22 +292,24 @@ async def heartbeat_loop():
             try:
                 # Reload config before each heartbeat
                 if not reload_config():
-                    print("ERROR: Invalid credentials detected. Stopping heartbeat loop.")
+                    logger.error("Invalid credentials detected. Stopping heartbeat loop.")
                     break
                     
                 await post(client, f"/api/agents/{current_agent_id}/heartbeat", {"message": "ok"})
             except Exception as e:
-                print(f"Heartbeat error: {e}")
+                logger.warning("Heartbeat error: %s", e)
             await asyncio.sleep(30)
 
 
 async def pull_config_loop():
+    global current_ad_accounts
     async with httpx.AsyncClient() as client:
         backoff = 5
         while True:
             try:
                 resp = await post(client, f"/api/agents/{AGENT_ID}/config:pull")
                 if resp.is_success:
+                    current_ad_accounts = resp.json().get("ad_accounts", [])
                     backoff = 5
                 else:
                     backoff = min(backoff * 2, 300)
@@ -218,63 +335,319 @@ async def pull_commands_loop():
             await asyncio.sleep(backoff)
 
 
+def collect_sync_data(account_id: str) -> Dict[str, Any] | None:
+    """Fetch the account snapshot sent to the CRM, or None if Meta is unreachable"""
+    account_client = get_meta_client(account_id)
+    
+    # Test Meta connection
+    if not account_client.test_connection():
+        return None
+    
+    # Get account info
+    account_info = account_client.get_ad_account_info()
+    
+    # Get campaigns
+    campaigns = account_client.get_campaigns(limit=10)
+    
+    return {
+        "meta_connected": True,
+        "account_info": account_info,
+        "campaigns": campaigns,
+        "last_sync": datetime.utcnow().isoformat() + "Z"
+    }
+
+
+def spawn_account_task(tasks: set, coro):
+    """Run one account's background sync without holding up the round"""
+    task = asyncio.create_task(coro)
+    tasks.add(task)
+    task.add_done_callback(tasks.discard)
+
+
+async def sync_account_meta_data(client: httpx.AsyncClient, account_id: str, shipped: Dict[str, Any]):
+    try:
+        # Keyed per account: if the previous round's job is still queued, this one replaces it
+        sync_data = await scheduler.run(Priority.BACKGROUND, collect_sync_data, account_id, key=f"sync:{account_id}")
+        if sync_data is None:
+            logger.warning("Meta API connection failed", extra={"account_id": account_id})
+            return
+        # Both waiters of a superseded job get the same result; send it once
+        if shipped.get(account_id) is sync_data:
+            return
+        shipped[account_id] = sync_data
+        # Send data to CRM
+        await post(client, f"/api/agents/{AGENT_ID}/meta:sync", sync_data)
+        logger.info("Synced Meta data", extra={"account_id": account_id, "campaigns": len(sync_data["campaigns"])})
+    except Exception as e:
+        logger.error("Failed to sync Meta data: %s", e, extra={"account_id": account_id})
+
+
 async def sync_meta_data_loop():
     """Sync Meta data every 5 minutes"""
+    last_synced: Dict[str, float] = {}
+    shipped: Dict[str, Any] = {}
+    tasks: set[asyncio.Task] = set()
     async with httpx.AsyncClient() as client:
-        while True:
-            try:
-                # Test Meta connection
-                if meta_client.test_connection():
-                    # Get account info
-                    account_info = meta_client.get_ad_account_info()
-                    
-                    # Get campaigns
-                    campaigns = meta_client.get_campaigns(limit=10)
-                    
-                    # Send data to CRM
-                    sync_data = {
-                        "meta_connected": True,
-                        "account_info": account_info,
-                        "campaigns": campaigns,
-                        "last_sync": datetime.utcnow().isoformat() + "Z"
-                    }
-                    
-                    await post(client, f"/api/agents/{AGENT_ID}/meta:sync", sync_data)
-                    print(f"Synced Meta data: {len(campaigns)} campaigns")
-                else:
-                    print("Meta API connection failed")
-                    
-            except Exception as e:
-                print(f"Failed to sync Meta data: {e}")
-            
-            # Wait 5 minutes before next sync
-            await asyncio.sleep(300)
+        try:
+            while True:
+                seen_ring_version = ring_version
+                try:
+                    if not await wait_for_ring_membership():
+                        logger.warning("Worker %s is not in the ring yet, skipping Meta sync round", WORKER_ID)
+                    round_started = time.monotonic()
+                    for account_id in due_account_ids(last_synced, 300):
+                        last_synced[account_id] = round_started
+                        spawn_account_task(tasks, sync_account_meta_data(client, account_id, shipped))
+                except Exception as e:
+                    logger.error("Failed to sync Meta data: %s", e)
+                
+                # Wait 5 minutes before next sync, or less if accounts moved to this worker
+                await wait_for_next_round(300, seen_ring_version)
+        finally:
+            for task in list(tasks):
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def crm_ad_account_id(meta_ad_account_id: str) -> str | None:
+    """Map a Meta ad account id to the CRM ad account id assigned to this agent"""
+    wanted = normalize_account_id(meta_ad_account_id)
+    for account in current_ad_accounts:
+        if normalize_account_id(account.get("meta_ad_account_id", "")) == wanted:
+            return account.get("id")
+    return None
 
 
-@app.on_event("startup")
-async def on_startup():
-    # Validate credentials at startup
-    if not reload_config():
-        print("ERROR: Invalid credentials at startup. Agent will not start.")
-        import sys
-        sys.exit(1)  # Exit the entire process
+def account_today(account_client: MetaAPIClient):
+    """Current date in the ad account's timezone, which is what insights dates use"""
+    timezone_name = account_client.get_ad_account_info().get("timezone_name")
+    try:
+        return datetime.now(ZoneInfo(timezone_name)).date()
+    except (ZoneInfoNotFoundError, TypeError, ValueError):
+        logger.warning("Unknown account timezone %s, using UTC", timezone_name)
+        return datetime.utcnow().date()
+
+
+def collect_daily_rollups(account_id: str, days: int = 2) -> DailyRollup:
+    """Pre-aggregate ad-level insights for the last few days into daily roll-ups"""
+    account_client = get_meta_client(account_id)
+    until = account_today(account_client)
+    since = until - timedelta(days=days - 1)
+    rollup = DailyRollup()
+    for row in account_client.get_insights_daily("ad", since.isoformat(), until.isoformat(), ROLLUP_FIELDS):
+        rollup.add_insights_row(row)
+    return rollup
+
+
+async def sync_account_rollups(client: httpx.AsyncClient, account_id: str, ad_account_id: str, shipped: Dict[str, Any]):
+    try:
+        # Yesterday is re-sent too, since Meta keeps restating recent days
+        rollup = await scheduler.run(Priority.BACKGROUND, collect_daily_rollups, account_id, key=f"rollups:{account_id}")
+        if shipped.get(account_id) is rollup:
+            return
+        shipped[account_id] = rollup
+        for payload in rollup.payloads(ad_account_id):
+            await post(client, "/api/ingest/metrics/rollups", payload)
+        logger.info("Synced metric roll-ups", extra={"account_id": account_id, "entity_days": len(rollup)})
+    except Exception as e:
+        logger.error("Failed to sync metric roll-ups: %s", e, extra={"account_id": account_id})
+
+
+async def sync_metric_rollups_loop():
+    """Ship per-entity daily roll-ups every 15 minutes instead of raw snapshots"""
+    last_synced: Dict[str, float] = {}
+    shipped: Dict[str, Any] = {}
+    tasks: set[asyncio.Task] = set()
+    async with httpx.AsyncClient() as client:
+        try:
+            while True:
+                seen_ring_version = ring_version
+                try:
+                    if not await wait_for_ring_membership():
+                        logger.warning("Worker %s is not in the ring yet, skipping roll-up round", WORKER_ID)
+                    round_started = time.monotonic()
+                    for account_id in due_account_ids(last_synced, 900):
+                        ad_account_id = crm_ad_account_id(account_id)
+                        if not ad_account_id:
+                            continue
+                        last_synced[account_id] = round_started
+                        spawn_account_task(tasks, sync_account_rollups(client, account_id, ad_account_id, shipped))
+                except Exception as e:
+                    logger.error("Failed to sync metric roll-ups: %s", e)
+                
+                await wait_for_next_round(900, seen_ring_version)
+        finally:
+            for task in list(tasks):
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def stop_subsystems(tasks: list[asyncio.Task]):
+    """Tear down whatever startup got to; logging is flushed last, even if teardown fails"""
+    try:
+        # Cancelling the loops closes their HTTP clients
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if scheduler is not None:
+            await scheduler.stop()
+        if observer is not None:
+            observer.stop()
+            await asyncio.to_thread(observer.join)
+        response_cache.clear()
+    finally:
+        shutdown_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global cred_manager, meta_client, observer, scheduler
+    
+    # Log writes happen on a background thread from here on
+    setup_logging()
+    observer = None
+    scheduler = None
+    tasks: list[asyncio.Task] = []
+    
+    try:
+        # Config, credentials and the Meta client are independent, so load them in parallel off the event loop
+        config_ok, cred_manager, meta_client = await asyncio.gather(
+            asyncio.to_thread(init_config),
+            asyncio.to_thread(init_credentials),
+            asyncio.to_thread(MetaAPIClient, find_config_path()),
+        )
+        
+        # Validate credentials at startup
+        if not config_ok:
+            raise RuntimeError("Invalid credentials at startup. Agent will not start.")
+        
+        observer = start_credential_watcher()
+        
+        # All Meta calls go through the scheduler so interactive requests overtake background sync
+        scheduler = MetaScheduler()
+        scheduler.start()
         
-    print(f"Agent starting with valid credentials: agent_id={current_agent_id}")
-    asyncio.create_task(heartbeat_loop())
-    asyncio.create_task(pull_config_loop())
-    asyncio.create_task(pull_commands_loop())
-    asyncio.create_task(sync_meta_data_loop())
+        logger.info("Agent starting", extra={"agent_id": current_agent_id, "worker": WORKER_ID or "standalone"})
+        loops = [pull_config_loop(), sync_meta_data_loop(), sync_metric_rollups_loop()]
+        # Under the supervisor only the first worker talks to the CRM on behalf of the whole agent
+        if WORKER_ID in (None, "w0"):
+            loops += [heartbeat_loop(), pull_commands_loop()]
+        if WORKER_ID:
+            loops.append(ring_refresh_loop())
+        tasks = [asyncio.create_task(loop) for loop in loops]
+    except BaseException:
+        # A failed startup never reaches the shutdown below; flush the queued
+        # errors so the reason is not lost when the process exits
+        await stop_subsystems(tasks)
+        raise
+    
+    try:
+        yield
+    finally:
+        await stop_subsystems(tasks)
+
+
+app = FastAPI(title="SM Agent", version="0.1.0", lifespan=lifespan)
+
+
+@app.middleware("http")
+async def correlation_middleware(request: Request, call_next):
+    """Tag a /meta/* request and every Graph call it makes with one correlation id"""
+    if not request.url.path.startswith("/meta/"):
+        return await call_next(request)
+    
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:16]
+    token = correlation_id.set(request_id)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+        logger.info("Handled request", extra={
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+    finally:
+        correlation_id.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
+# Rendered /meta/* responses per (account, path), so a repeated dashboard read -
+# conditional or not - is answered without calling Meta while the entry is fresh
+RESPONSE_CACHE_TTL = 60.0
+RESPONSE_CACHE_MAX_ENTRIES = 1000
+response_cache: Dict[Tuple[str, str], Tuple[float, bytes, str]] = {}
+
+def account_key(account_id: str | None) -> str:
+    """Normalised ad account id a request refers to (default: the configured one)"""
+    return normalize_account_id(account_id or meta_client.ad_account_id)
+
+def response_cache_key(request: Request, account_id: str | None) -> Tuple[str, str]:
+    return (account_key(account_id), request.url.path)
+
+def invalidate_response_cache(account_id: str | None):
+    """Drop every cached response of an account, e.g. after a mutation"""
+    account = account_key(account_id)
+    for key in [key for key in response_cache if key[0] == account]:
+        del response_cache[key]
+
+def etag_response(request: Request, body: bytes, etag: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def cached_response(request: Request, account_id: str | None) -> Response | None:
+    """Serve a fresh cached response (or 304), or None when Meta has to be called"""
+    entry = response_cache.get(response_cache_key(request, account_id))
+    if entry is None or time.monotonic() - entry[0] > RESPONSE_CACHE_TTL:
+        return None
+    return etag_response(request, entry[1], entry[2])
+
+def conditional_json(request: Request, account_id: str | None, payload: Dict[str, Any], etag_source: Any = None, cache: bool = True) -> Response:
+    """Serialise and cache a payload with an ETag, answering 304 when the client already has it
+    
+    By default the ETag is a hash of the serialised body; pass etag_source to hash
+    only the parts of the payload that identify its content (e.g. without timestamps).
+    Diagnostic endpoints pass cache=False so every call really reaches Meta.
+    """
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    if etag_source is None:
+        digest = hashlib.sha256(body).hexdigest()
+    else:
+        digest = hashlib.sha256(json.dumps(etag_source, separators=(",", ":"), sort_keys=True).encode()).hexdigest()
+    etag = f'"{digest[:32]}"'
+    
+    if not cache:
+        return etag_response(request, body, etag)
+    
+    now = time.monotonic()
+    if len(response_cache) >= RESPONSE_CACHE_MAX_ENTRIES:
+        for key in [key for key, entry in response_cache.items() if now - entry[0] > RESPONSE_CACHE_TTL]:
+            del response_cache[key]
+        if len(response_cache) >= RESPONSE_CACHE_MAX_ENTRIES:
+            del response_cache[next(iter(response_cache))]
+    response_cache[response_cache_key(request, account_id)] = (now, body, etag)
+    return etag_response(request, body, etag)
 
 
 @app.get("/healthz")
 def healthz():
     return {"status": "ok", "time": datetime.utcnow().isoformat() + "Z"}
 
+@app.get("/metrics/scheduler")
+def scheduler_metrics():
+    """Queue depth, concurrency and queue-wait statistics per priority class"""
+    return {"status": "success", "data": scheduler.metrics()}
+
 @app.get("/meta/test")
-def test_meta_connection():
+async def test_meta_connection(account_id: str | None = None):
     """Test connection to Meta API"""
     try:
-        if meta_client.test_connection():
+        client = get_meta_client(account_id)
+        if await scheduler.run(Priority.READ, client.test_connection):
             return {"status": "success", "message": "Meta API connection successful"}
         else:
             return {"status": "error", "message": "Meta API connection failed"}
@@ -282,37 +655,96 @@ def test_meta_connection():
         return {"status": "error", "message": f"Meta API error: {str(e)}"}
 
 @app.get("/meta/account")
-def get_meta_account():
+async def get_meta_account(request: Request, account_id: str | None = None):
     """Get Meta app information"""
+    cached = cached_response(request, account_id)
+    if cached is not None:
+        return cached
     try:
-        app_info = meta_client.get_app_info()
-        return {"status": "success", "data": app_info}
+        client = get_meta_client(account_id)
+        app_info = await scheduler.run(Priority.READ, client.get_app_info, key=f"account:{account_key(account_id)}")
+        return conditional_json(request, account_id, {"status": "success", "data": app_info})
     except Exception as e:
         return {"status": "error", "message": f"Failed to get app info: {str(e)}"}
 
 @app.get("/meta/campaigns")
-def get_meta_campaigns():
+async def get_meta_campaigns(request: Request, account_id: str | None = None):
     """Get Meta campaigns"""
+    cached = cached_response(request, account_id)
+    if cached is not None:
+        return cached
     try:
-        campaigns = meta_client.get_campaigns()
-        return {"status": "success", "data": campaigns}
+        client = get_meta_client(account_id)
+        campaigns = await scheduler.run(Priority.READ, client.get_campaigns, key=f"campaigns:{account_key(account_id)}")
+        return conditional_json(request, account_id, {"status": "success", "data": campaigns})
     except Exception as e:
         return {"status": "error", "message": f"Failed to get campaigns: {str(e)}"}
 
 @app.get("/meta/insights")
-def get_meta_insights():
+async def get_meta_insights(request: Request, account_id: str | None = None):
     """Get Meta insights/metrics"""
+    cached = cached_response(request, account_id)
+    if cached is not None:
+        return cached
     try:
-        insights = meta_client.get_insights()
-        return {"status": "success", "data": insights}
+        client = get_meta_client(account_id)
+        insights = await scheduler.run(Priority.READ, client.get_insights, key=f"insights:{account_key(account_id)}")
+        return conditional_json(request, account_id, {"status": "success", "data": insights})
     except Exception as e:
         return {"status": "error", "message": f"Failed to get insights: {str(e)}"}
 
+def run_export_fetch(fn, client: MetaAPIClient, level: str, day: str, fields: str):
+    """Run one day's export fetch from a worker thread as a BACKGROUND scheduler job
+    
+    Keyed per account, level and day, so concurrent exports of the same range share
+    each day's Graph API crawl.
+    """
+    key = f"export:{account_key(client.ad_account_id)}:{level}:{day}"
+    return anyio.from_thread.run(functools.partial(scheduler.run, Priority.BACKGROUND, fn, client, level, day, fields, key=key))
+
+@app.get("/meta/insights/export")
+def export_meta_insights(since: str, until: str, level: str = "ad", account_id: str | None = None):
+    """Stream daily insights for campaigns/ad sets/ads as an Arrow IPC stream"""
+    # Imported lazily so pyarrow is only loaded when an export is requested
+    try:
+        try:
+            from .insights_export import ARROW_STREAM_MEDIA_TYPE, LEVEL_ID_FIELDS, MAX_EXPORT_DAYS, parse_date_range, stream_arrow_ipc
+        except ImportError:
+            from insights_export import ARROW_STREAM_MEDIA_TYPE, LEVEL_ID_FIELDS, MAX_EXPORT_DAYS, parse_date_range, stream_arrow_ipc
+    except ImportError as e:
+        # pyarrow is an optional dependency of the export only
+        return {"status": "error", "message": f"Insights export unavailable: {str(e)}"}
+    
+    try:
+        client = get_meta_client(account_id)
+    except ValueError as e:
+        return {"status": "error", "message": f"Failed to export insights: {str(e)}"}
+
+    try:
+        if level not in LEVEL_ID_FIELDS:
+            return {"status": "error", "message": f"Invalid level. Must be one of {', '.join(LEVEL_ID_FIELDS)}"}
+        parse_date_range(since, until, max_days=MAX_EXPORT_DAYS)
+    except ValueError as e:
+        return {"status": "error", "message": f"Invalid date range: {str(e)}"}
+    
+    filename = f"insights_{level}_{since}_{until}.arrows"
+    return StreamingResponse(
+        # The generator runs in a worker thread; each day's fetch is queued as background work
+        stream_arrow_ipc(client, level, since, until, run=run_export_fetch),
+        media_type=ARROW_STREAM_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @app.get("/meta/campaigns/hierarchical")
-def get_hierarchical_campaigns():
+async def get_hierarchical_campaigns(request: Request, account_id: str | None = None):
     """Get campaigns with hierarchical structure (campaigns -> ad sets -> ads)"""
+    cached = cached_response(request, account_id)
+    if cached is not None:
+        return cached
     try:
-        campaigns = meta_client.get_campaigns_detailed(limit=100)
+        client = get_meta_client(account_id)
+        # Concurrent dashboard refreshes of an account collapse into one Meta crawl
+        campaigns = await scheduler.run(Priority.READ, client.get_campaigns_detailed, limit=100, key=f"hierarchical:{account_key(account_id)}")
         
         # Format the response in a clean hierarchical structure
         hierarchical_data = {
@@ -331,23 +763,25 @@ def get_hierarchical_campaigns():
             }
         }
         
-        return hierarchical_data
+        # last_updated changes on every call, so only the campaigns feed the ETag
+        return conditional_json(request, account_id, hierarchical_data, etag_source=campaigns)
     except Exception as e:
         return {"status": "error", "message": f"Failed to get hierarchical campaigns: {str(e)}"}
 
 @app.get("/meta/test/hierarchical")
-def test_hierarchical_structure():
+async def test_hierarchical_structure(request: Request, account_id: str | None = None):
     """Test endpoint to verify Meta API integration with detailed hierarchical display"""
     try:
+        client = get_meta_client(account_id)
         # Test connection first
-        if not meta_client.test_connection():
+        if not await scheduler.run(Priority.READ, client.test_connection):
             return {"status": "error", "message": "Meta API connection failed"}
         
         # Get account info
-        account_info = meta_client.get_ad_account_info()
+        account_info = await scheduler.run(Priority.READ, client.get_ad_account_info)
         
         # Get campaigns with full hierarchy
-        campaigns = meta_client.get_campaigns_detailed(limit=100)
+        campaigns = await scheduler.run(Priority.READ, client.get_campaigns_detailed, limit=100)
         
         # Create detailed hierarchical display
         hierarchical_display = {
@@ -423,7 +857,7 @@ def test_hierarchical_structure():
             
             hierarchical_display["hierarchical_structure"]["campaigns"].append(campaign_data)
         
-        return hierarchical_display
+        return conditional_json(request, account_id, hierarchical_display, cache=False)
         
     except Exception as e:
         return {
@@ -433,20 +867,21 @@ def test_hierarchical_structure():
         }
 
 @app.get("/meta/test/simple")
-def test_simple_campaigns():
+async def test_simple_campaigns(request: Request, account_id: str | None = None):
     """Simple test endpoint that just shows campaigns without nested data"""
     try:
+        client = get_meta_client(account_id)
         # Test connection first
-        if not meta_client.test_connection():
+        if not await scheduler.run(Priority.READ, client.test_connection):
             return {"status": "error", "message": "Meta API connection failed"}
         
         # Get account info
-        account_info = meta_client.get_ad_account_info()
+        account_info = await scheduler.run(Priority.READ, client.get_ad_account_info)
         
         # Get campaigns only (no nested data to avoid rate limits)
-        campaigns = meta_client.get_campaigns(limit=100)
+        campaigns = await scheduler.run(Priority.READ, client.get_campaigns, limit=100)
         
-        return {
+        return conditional_json(request, account_id, {
             "status": "success",
             "message": "Meta Marketing API Integration Test - SUCCESS (Simple)",
             "account_info": account_info,
@@ -457,7 +892,7 @@ def test_simple_campaigns():
                 "paused_campaigns": len([c for c in campaigns if c.get("status") == "PAUSED"]),
                 "archived_campaigns": len([c for c in campaigns if c.get("status") == "ARCHIVED"])
             }
-        }
+        }, cache=False)
         
     except Exception as e:
         return {
@@ -467,17 +902,21 @@ def test_simple_campaigns():
         }
 
 @app.get("/meta/campaigns/{campaign_id}/adsets")
-def get_campaign_adsets(campaign_id: str):
+async def get_campaign_adsets(request: Request, campaign_id: str, account_id: str | None = None):
     """Get ad sets for a specific campaign"""
+    cached = cached_response(request, account_id)
+    if cached is not None:
+        return cached
     try:
+        client = get_meta_client(account_id)
         # Test connection first
-        if not meta_client.test_connection():
+        if not await scheduler.run(Priority.READ, client.test_connection):
             return {"status": "error", "message": "Meta API connection failed"}
         
         # Get ad sets for the specific campaign
-        ad_sets = meta_client.get_ad_sets(campaign_id, limit=50)
+        ad_sets = await scheduler.run(Priority.READ, client.get_ad_sets, campaign_id, limit=50)
         
-        return {
+        return conditional_json(request, account_id, {
             "status": "success",
             "message": f"Ad sets for campaign {campaign_id}",
             "campaign_id": campaign_id,
@@ -488,7 +927,7 @@ def get_campaign_adsets(campaign_id: str):
                 "paused_ad_sets": len([ads for ads in ad_sets if ads.get("status") == "PAUSED"]),
                 "archived_ad_sets": len([ads for ads in ad_sets if ads.get("status") == "ARCHIVED"])
             }
-        }
+        })
         
     except Exception as e:
         return {
@@ -498,17 +937,21 @@ def get_campaign_adsets(campaign_id: str):
         }
 
 @app.get("/meta/adsets/{adset_id}/ads")
-def get_adset_ads(adset_id: str):
+async def get_adset_ads(request: Request, adset_id: str, account_id: str | None = None):
     """Get ads for a specific ad set"""
+    cached = cached_response(request, account_id)
+    if cached is not None:
+        return cached
     try:
+        client = get_meta_client(account_id)
         # Test connection first
-        if not meta_client.test_connection():
+        if not await scheduler.run(Priority.READ, client.test_connection):
             return {"status": "error", "message": "Meta API connection failed"}
         
         # Get ads for the specific ad set
-        ads = meta_client.get_ads(adset_id, limit=50)
+        ads = await scheduler.run(Priority.READ, client.get_ads, adset_id, limit=50)
         
-        return {
+        return conditional_json(request, account_id, {
             "status": "success",
             "message": f"Ads for ad set {adset_id}",
             "adset_id": adset_id,
@@ -519,7 +962,7 @@ def get_adset_ads(adset_id: str):
                 "paused_ads": len([ad for ad in ads if ad.get("status") == "PAUSED"]),
                 "archived_ads": len([ad for ad in ads if ad.get("status") == "ARCHIVED"])
             }
-        }
+        })
         
     except Exception as e:
         return {
@@ -532,11 +975,12 @@ class AdSetStatusUpdate(BaseModel):
     status: str
 
 @app.put("/meta/adsets/{adset_id}/status")
-def update_adset_status(adset_id: str, status_data: AdSetStatusUpdate):
+async def update_adset_status(adset_id: str, status_data: AdSetStatusUpdate, account_id: str | None = None):
     """Update the status of an ad set"""
     try:
+        client = get_meta_client(account_id)
         # Test connection first
-        if not meta_client.test_connection():
+        if not await scheduler.run(Priority.INTERACTIVE, client.test_connection):
             return {"status": "error", "message": "Meta API connection failed"}
         
         status = status_data.status
@@ -547,7 +991,8 @@ def update_adset_status(adset_id: str, status_data: AdSetStatusUpdate):
             return {"status": "error", "message": "Invalid status. Must be ACTIVE, PAUSED, or ARCHIVED"}
         
         # Update the ad set status
-        result = meta_client.update_ad_set_status(adset_id, status)
+        result = await scheduler.run(Priority.INTERACTIVE, client.update_ad_set_status, adset_id, status)
+        invalidate_response_cache(account_id)
         
         return {
             "status": "success",
@@ -581,14 +1026,16 @@ def update_adset_status(adset_id: str, status_data: AdSetStatusUpdate):
         }
 
 @app.post("/meta/campaigns")
-def create_meta_campaign(campaign_data: Dict[str, Any]):
+async def create_meta_campaign(campaign_data: Dict[str, Any], account_id: str | None = None):
     """Create a new Meta campaign"""
     try:
+        client = get_meta_client(account_id)
         name = campaign_data.get("name")
         objective = campaign_data.get("objective", "OUTCOME_TRAFFIC")
         status = campaign_data.get("status", "PAUSED")
         
-        result = meta_client.create_campaign(name, objective, status)
+        result = await scheduler.run(Priority.INTERACTIVE, client.create_campaign, name, objective, status)
+        invalidate_response_cache(account_id)
         return {"status": "success", "data": result}
     except Exception as e:
         return {"status": "error", "message": f"Failed to create campaign: {str(e)}"}
@@ -1,11 +1,33 @@
 import json
+import os
+import time
 import requests
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any
 from pathlib import Path
+from urllib.parse import urlencode
 
 logger = logging.getLogger(__name__)
 
+# Config locations for the different execution contexts
+CONFIG_PATHS = [
+    '/app/config/meta_config.json',  # Docker
+    str(Path(__file__).parent.parent / 'config' / 'meta_config.json'),  # Local development
+    'config/meta_config.json',  # Current directory
+]
+
+def config_paths() -> List[str]:
+    """Config locations to try, in order; AGENT_CONFIG_PATH replaces the defaults when set"""
+    override = os.getenv("AGENT_CONFIG_PATH")
+    return [override] if override else CONFIG_PATHS
+
+def find_config_path() -> str:
+    """Return the first existing config path, or the default relative one"""
+    for path in config_paths():
+        if Path(path).exists():
+            return path
+    return "config/meta_config.json"
+
 class MetaAPIClient:
     """Client for interacting with Meta's Marketing API"""
     
@@ -27,17 +49,22 @@ class MetaAPIClient:
             with open(config_file, 'r') as f:
                 return json.load(f)
         except Exception as e:
-            logger.error(f"Failed to load config: {e}")
+            logger.error("Failed to load config: %s", e)
             raise
     
     def _make_request(self, endpoint: str, method: str = "GET", data: Optional[Dict] = None) -> Dict[str, Any]:
         """Make a request to Meta's API"""
-        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        # Paging cursors from Meta come back as absolute URLs
+        if endpoint.startswith("http"):
+            url = endpoint
+        else:
+            url = f"{self.base_url}/{endpoint.lstrip('/')}"
         headers = {
             "Authorization": f"Bearer {self.access_token}",
             "Content-Type": "application/json"
         }
         
+        started = time.perf_counter()
         try:
             if method == "GET":
                 response = requests.get(url, headers=headers, timeout=self.timeout)
@@ -50,13 +77,23 @@ class MetaAPIClient:
             else:
                 raise ValueError(f"Unsupported HTTP method: {method}")
             
+            self._log_call(method, url, response.status_code, started)
             response.raise_for_status()
             return response.json()
             
         except requests.exceptions.RequestException as e:
-            logger.error(f"API request failed: {e}")
+            logger.error("API request failed: %s", e)
             raise
     
+    def _log_call(self, method: str, url: str, status: int, started: float):
+        """Record a Graph API call; the query string is left out as it may carry tokens"""
+        logger.info("Graph API call", extra={
+            "method": method,
+            "path": url.split("?", 1)[0].removeprefix(self.base_url),
+            "status": status,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+    
     def get_app_info(self) -> Dict[str, Any]:
         """Get information about the Meta app"""
         endpoint = f"{self.app_id}"
@@ -89,6 +126,26 @@ class MetaAPIClient:
         response = self._make_request(f"{endpoint}?{'&'.join([f'{k}={v}' for k, v in params.items()])}")
         return response.get("data", [{}])[0] if response.get("data") else {}
     
+    def get_insights_daily(self, level: str, since: str, until: str, fields: str) -> Iterator[Dict[str, Any]]:
+        """Get insights rows for every campaign/ad set/ad, broken down per day
+
+        Follows Meta's paging cursors and yields rows one at a time so callers
+        can process long date ranges without holding the whole result.
+        """
+        endpoint = f"act_{self.ad_account_id}/insights"
+        params = {
+            "level": level,
+            "time_range": json.dumps({"since": since, "until": until}, separators=(",", ":")),
+            "time_increment": 1,
+            "limit": 500,
+            "fields": fields
+        }
+        next_url: Optional[str] = f"{endpoint}?{urlencode(params)}"
+        while next_url:
+            response = self._make_request(next_url)
+            yield from response.get("data", [])
+            next_url = response.get("paging", {}).get("next")
+    
     def get_ad_sets(self, campaign_id: str, limit: int = 25) -> List[Dict[str, Any]]:
         """Get ad sets for a specific campaign"""
         endpoint = f"{campaign_id}/adsets"
@@ -135,11 +192,11 @@ class MetaAPIClient:
                         ads = self.get_ads(ad_set["id"], limit=50)
                         ad_set["ads"] = ads
                     except Exception as e:
-                        logger.warning(f"Failed to get ads for ad set {ad_set.get('id')}: {e}")
+                        logger.warning("Failed to get ads for ad set %s: %s", ad_set.get('id'), e)
                         ad_set["ads"] = []
                         
             except Exception as e:
-                logger.warning(f"Failed to get ad sets for campaign {campaign.get('id')}: {e}")
+                logger.warning("Failed to get ad sets for campaign %s: %s", campaign.get('id'), e)
                 campaign["ad_sets"] = []
         
         return campaigns
@@ -171,7 +228,9 @@ class MetaAPIClient:
             
             # Use POST with form data (data parameter) instead of PUT with JSON
             # Include access_token in query params as per Meta API documentation examples
+            started = time.perf_counter()
             response = requests.post(url, headers=headers, params=params, data=data, timeout=self.timeout)
+            self._log_call("POST", url, response.status_code, started)
             response.raise_for_status()
             return response.json()
             
@@ -184,13 +243,13 @@ class MetaAPIClient:
                     if 'error' in error_data:
                         error_info = error_data['error']
                         error_msg = f"Meta API Error {error_info.get('code', '')}: {error_info.get('message', str(e))}"
-                        logger.error(f"{error_msg} - Full response: {error_data}")
+                        logger.error("%s - Full response: %s", error_msg, error_data)
                 except:
                     error_msg = f"{error_msg} - Response: {e.response.text}"
-            logger.error(error_msg)
+            logger.error("%s", error_msg)
             raise
         except requests.exceptions.RequestException as e:
-            logger.error(f"API request failed: {e}")
+            logger.error("API request failed: %s", e)
             raise
 
     def test_connection(self) -> bool:
@@ -199,5 +258,5 @@ class MetaAPIClient:
             self.get_ad_account_info()
             return True
         except Exception as e:
-            logger.error(f"Connection test failed: {e}")
+            logger.error("Connection test failed: %s", e)
             return False
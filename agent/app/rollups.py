@@ -0,0 +1,81 @@
+"""Agent-side pre-aggregation of metrics into per-entity, per-day roll-ups.
+
+Ad-level daily insights are folded into running totals for every ad, ad set
+and campaign, so the backend can upsert compact DailyMetric records directly
+instead of storing and later re-grouping raw MetricSnapshot documents.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, List, Tuple
+
+SCOPES = ("AD", "AD_SET", "CAMPAIGN")
+
+# Ad-level insights fields needed to build roll-ups for all three scopes
+ROLLUP_FIELDS = "campaign_id,adset_id,ad_id,impressions,clicks,spend,conversions"
+
+METRICS = ("impressions", "clicks", "spend_minor", "conversions")
+
+
+def parse_insights_row(row: Dict[str, Any]) -> Dict[str, int]:
+    """Convert the string-encoded numbers of an insights row into integer metrics"""
+    conversions = 0
+    for action in row.get("conversions") or []:
+        try:
+            conversions += int(float(action.get("value", 0)))
+        except (TypeError, ValueError):
+            continue
+    return {
+        "impressions": int(float(row.get("impressions") or 0)),
+        "clicks": int(float(row.get("clicks") or 0)),
+        # Decimal avoids float artefacts such as 1.005 * 100 == 100.49999...
+        "spend_minor": int((Decimal(str(row.get("spend") or 0)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP)),
+        "conversions": conversions,
+    }
+
+
+class DailyRollup:
+    """Running totals keyed by (scope, meta_id, date)"""
+
+    def __init__(self):
+        self.totals: Dict[Tuple[str, str, str], Dict[str, int]] = {}
+
+    def add(self, scope: str, meta_id: str, date: str, metrics: Dict[str, int]):
+        """Add one sample to the totals of an entity for a day"""
+        if scope not in SCOPES:
+            raise ValueError(f"Invalid scope: {scope}")
+        key = (scope, meta_id, date)
+        totals = self.totals.get(key)
+        if totals is None:
+            totals = self.totals[key] = {name: 0 for name in METRICS}
+        for name in METRICS:
+            totals[name] += metrics.get(name, 0)
+
+    def add_insights_row(self, row: Dict[str, Any]):
+        """Fold an ad-level daily insights row into its ad, ad set and campaign"""
+        date = row.get("date_start")
+        if not date:
+            return
+        metrics = parse_insights_row(row)
+        for scope, id_field in (("AD", "ad_id"), ("AD_SET", "adset_id"), ("CAMPAIGN", "campaign_id")):
+            meta_id = row.get(id_field)
+            if meta_id:
+                self.add(scope, meta_id, date, metrics)
+
+    def items(self, scope: str) -> List[Dict[str, Any]]:
+        """Roll-up items for one scope, in the shape the backend ingests"""
+        return [
+            {"meta_id": meta_id, "date": date, **totals}
+            for (item_scope, meta_id, date), totals in sorted(self.totals.items())
+            if item_scope == scope
+        ]
+
+    def payloads(self, ad_account_id: str) -> List[Dict[str, Any]]:
+        """One request body per non-empty scope for POST /api/ingest/metrics/rollups"""
+        payloads = []
+        for scope in SCOPES:
+            items = self.items(scope)
+            if items:
+                payloads.append({"ad_account_id": ad_account_id, "scope": scope, "items": items})
+        return payloads
+
+    def __len__(self):
+        return len(self.totals)
@@ -0,0 +1,239 @@
+"""Priority scheduler for Meta API work.
+
+All Meta calls are submitted as jobs in one of three classes so that a user's
+interactive mutation never waits behind a full-account background crawl:
+
+- INTERACTIVE: mutations triggered by a user (status changes, campaign creation)
+- READ: dashboard reads
+- BACKGROUND: periodic sync loops
+
+READ and BACKGROUND jobs have their own concurrency limits and also share a
+global cap; INTERACTIVE slots are reserved on top of that cap, so a mutation
+starts right away even while reads and background sync saturate it. Jobs age
+while they wait (one priority level per `aging_seconds`) so background work is
+never starved.
+
+A READ or BACKGROUND job submitted with the `key` of a job that has not started
+yet supersedes it: the queued job is replaced by the newer call, keeping its
+place in the queue, and every waiter of both receives the one result. Waiters
+are independent - one of them being cancelled (e.g. a client disconnecting)
+never affects the others, and the job is only dropped once no waiter is left.
+Dashboard reads are keyed per account, so repeated refreshes queued behind a
+slow crawl collapse into a single Meta call; background sync, roll-up and export
+fetches are keyed per account too, so a round submitted while the previous one
+is still queued replaces it instead of crawling the account twice.
+
+Interactive mutations never supersede and are never superseded: every one of
+them has to reach Meta. They also leave queued background jobs alone - those
+have not read anything yet, so they will already see the mutation.
+"""
+import asyncio
+import contextvars
+import functools
+import itertools
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    READ = 1
+    BACKGROUND = 2
+
+
+DEFAULT_LIMITS = {
+    Priority.INTERACTIVE: 4,
+    Priority.READ: 4,
+    Priority.BACKGROUND: 2,
+}
+
+
+@dataclass
+class Job:
+    priority: Priority
+    fn: Callable[..., Any]
+    args: tuple
+    kwargs: Dict[str, Any]
+    seq: int
+    key: Optional[str] = None
+    # One future per submitter waiting on this job's result
+    waiters: List[asyncio.Future] = field(default_factory=list)
+    submitted_at: float = field(default_factory=time.monotonic)
+    # Submitter's context, so context variables (e.g. correlation ids) follow the job
+    context: contextvars.Context = field(default_factory=contextvars.copy_context)
+
+    def pending(self) -> bool:
+        """Whether anyone is still waiting for the result"""
+        return any(not waiter.done() for waiter in self.waiters)
+
+    def set_result(self, result: Any):
+        for waiter in self.waiters:
+            if not waiter.done():
+                waiter.set_result(result)
+
+    def set_exception(self, error: BaseException):
+        for waiter in self.waiters:
+            if not waiter.done():
+                waiter.set_exception(error)
+
+    def cancel(self):
+        for waiter in self.waiters:
+            waiter.cancel()
+
+
+@dataclass
+class ClassStats:
+    queued: int = 0
+    running: int = 0
+    completed: int = 0
+    failed: int = 0
+    superseded: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        started = self.completed + self.failed
+        return {
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "superseded": self.superseded,
+            "wait_avg_ms": round(self.wait_total / started * 1000, 1) if started else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 1),
+        }
+
+
+class MetaScheduler:
+    """Runs blocking Meta client calls in worker threads, highest priority first"""
+
+    def __init__(self, limits: Optional[Dict[Priority, int]] = None, max_concurrency: int = 6, aging_seconds: float = 10.0):
+        self.limits = dict(limits or DEFAULT_LIMITS)
+        self.max_concurrency = max_concurrency
+        self.aging_seconds = aging_seconds
+        self.queues: Dict[Priority, Deque[Job]] = {priority: deque() for priority in Priority}
+        self.stats: Dict[Priority, ClassStats] = {priority: ClassStats() for priority in Priority}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._running: set[asyncio.Task] = set()
+        # Own threads, sized so reserved INTERACTIVE slots are never stuck behind a full default pool
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency + self.limits[Priority.INTERACTIVE],
+            thread_name_prefix="meta-scheduler",
+        )
+
+    def start(self):
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self):
+        """Stop dispatching and cancel queued and running jobs"""
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+        for queue in self.queues.values():
+            while queue:
+                queue.popleft().cancel()
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.gather(*self._running, return_exceptions=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, priority: Priority, fn: Callable[..., Any], *args, key: Optional[str] = None, **kwargs) -> asyncio.Future:
+        """Queue a job and return a future for its result
+
+        Each call gets its own future, so cancelling it only withdraws this caller.
+        """
+        waiter = asyncio.get_running_loop().create_future()
+        queue = self.queues[priority]
+
+        # Mutations are never merged, each one has to reach Meta
+        if key is not None and priority != Priority.INTERACTIVE:
+            queued = next((job for job in queue if job.key == key and job.pending()), None)
+            if queued is not None:
+                # The newer call runs in the older one's place, for all of their waiters
+                queued.fn, queued.args, queued.kwargs = fn, args, kwargs
+                queued.context = contextvars.copy_context()
+                queued.waiters.append(waiter)
+                self.stats[priority].superseded += 1
+                return waiter
+
+        queue.append(Job(priority, fn, args, kwargs, next(self._seq), key, [waiter]))
+        self.stats[priority].queued += 1
+        self._wakeup.set()
+        return waiter
+
+    async def run(self, priority: Priority, fn: Callable[..., Any], *args, key: Optional[str] = None, **kwargs) -> Any:
+        """Submit a job and wait for its result"""
+        return await self.submit(priority, fn, *args, key=key, **kwargs)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {priority.name.lower(): self.stats[priority].as_dict() for priority in Priority}
+
+    def _effective_priority(self, job: Job, now: float) -> float:
+        return job.priority - (now - job.submitted_at) / self.aging_seconds
+
+    def _next_job(self) -> Optional[Job]:
+        """Pick the head job with the best aged priority among classes with free capacity"""
+        shared_running = sum(stats.running for priority, stats in self.stats.items() if priority != Priority.INTERACTIVE)
+        now = time.monotonic()
+        best: Optional[Job] = None
+        for priority, queue in self.queues.items():
+            # Drop jobs whose waiters have all gone away (e.g. clients disconnected)
+            while queue and not queue[0].pending():
+                queue.popleft()
+                self.stats[priority].queued -= 1
+            if not queue or self.stats[priority].running >= self.limits[priority]:
+                continue
+            if priority != Priority.INTERACTIVE and shared_running >= self.max_concurrency:
+                continue
+            head = queue[0]
+            if best is None or (self._effective_priority(head, now), head.seq) < (self._effective_priority(best, now), best.seq):
+                best = head
+
+        if best is not None:
+            self.queues[best.priority].popleft()
+            self.stats[best.priority].queued -= 1
+        return best
+
+    async def _dispatch_loop(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                # Ageing only matters when choosing, which happens on the next submit or completion
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            stats = self.stats[job.priority]
+            wait = time.monotonic() - job.submitted_at
+            stats.wait_total += wait
+            stats.wait_max = max(stats.wait_max, wait)
+            stats.running += 1
+
+            task = asyncio.create_task(self._execute(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _execute(self, job: Job):
+        stats = self.stats[job.priority]
+        try:
+            call = functools.partial(job.context.run, job.fn, *job.args, **job.kwargs)
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, call)
+        except asyncio.CancelledError:
+            job.cancel()
+            raise
+        except Exception as e:
+            stats.failed += 1
+            job.set_exception(e)
+        else:
+            stats.completed += 1
+            job.set_result(result)
+        finally:
+            stats.running -= 1
+            self._wakeup.set()
+
@@ -0,0 +1,219 @@
+"""Horizontal sharding of the agent across worker processes.
+
+A supervisor spawns N uvicorn workers, assigns ad accounts to them with a
+consistent hash ring and fronts them with a small proxy that routes each
+/meta/* request to the worker owning the requested account. When a worker
+dies it is dropped from the ring (its accounts move to the neighbours), then
+restarted and added back once it is healthy again.
+"""
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+
+try:
+    from .meta_client import find_config_path
+    from .logging_setup import setup_logging, shutdown_logging
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).parent))
+    from meta_client import find_config_path
+    from logging_setup import setup_logging, shutdown_logging
+
+logger = logging.getLogger(__name__)
+
+AGENT_DIR = Path(__file__).parent.parent
+
+# Hop-by-hop headers that must not be forwarded by the proxy
+HOP_BY_HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "content-length", "host", "upgrade"}
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes"""
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 100):
+        self.replicas = replicas
+        self._keys: List[int] = []
+        self._owners: Dict[int, str] = {}
+        self.nodes: set[str] = set()
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int(hashlib.md5(key.encode()).hexdigest()[:16], 16)
+
+    def add(self, node: str):
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.replicas):
+            point = self._hash(f"{node}#{i}")
+            self._owners[point] = node
+            bisect.insort(self._keys, point)
+
+    def remove(self, node: str):
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        for i in range(self.replicas):
+            point = self._hash(f"{node}#{i}")
+            del self._owners[point]
+            self._keys.remove(point)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the node owning a key, or None when the ring is empty"""
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, self._hash(str(key))) % len(self._keys)
+        return self._owners[self._keys[index]]
+
+
+def normalize_account_id(account_id: str) -> str:
+    """Hash accounts the same way whether or not they carry the act_ prefix"""
+    return str(account_id).removeprefix("act_")
+
+
+def default_account_id() -> Optional[str]:
+    """Ad account used when a request does not name one"""
+    try:
+        with open(find_config_path(), 'r') as f:
+            return json.load(f)["meta_api"]["ad_account_id"]
+    except (OSError, KeyError, ValueError):
+        return os.getenv("META_AD_ACCOUNT_ID")
+
+
+class Supervisor:
+    """Spawns, monitors and restarts agent worker processes"""
+
+    def __init__(self, workers: int, base_port: int = 9100, supervisor_url: str = "http://127.0.0.1:9000"):
+        self.worker_ports = {f"w{i}": base_port + i for i in range(workers)}
+        self.supervisor_url = supervisor_url
+        self.processes: Dict[str, subprocess.Popen] = {}
+        self.ring = HashRing()
+        self.default_account_id = default_account_id()
+
+    def worker_url(self, worker_id: str) -> str:
+        return f"http://127.0.0.1:{self.worker_ports[worker_id]}"
+
+    def owner(self, account_id: Optional[str]) -> Optional[str]:
+        account_id = account_id or self.default_account_id or ""
+        return self.ring.get(normalize_account_id(account_id))
+
+    def spawn(self, worker_id: str):
+        env = dict(os.environ)
+        env["AGENT_WORKER_ID"] = worker_id
+        env["AGENT_SUPERVISOR_URL"] = self.supervisor_url
+        self.processes[worker_id] = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "app.main:app",
+                "--app-dir", str(AGENT_DIR),
+                "--host", "127.0.0.1",
+                "--port", str(self.worker_ports[worker_id]),
+            ],
+            env=env,
+        )
+        logger.info("Started worker %s on port %s", worker_id, self.worker_ports[worker_id])
+
+    async def is_healthy(self, client: httpx.AsyncClient, worker_id: str) -> bool:
+        try:
+            resp = await client.get(f"{self.worker_url(worker_id)}/healthz", timeout=2.0)
+            return resp.is_success
+        except httpx.HTTPError:
+            return False
+
+    async def monitor_loop(self):
+        """Keep the ring in sync with the set of live, healthy workers"""
+        async with httpx.AsyncClient() as client:
+            while True:
+                for worker_id in self.worker_ports:
+                    process = self.processes.get(worker_id)
+                    if process is None or process.poll() is not None:
+                        if worker_id in self.ring.nodes:
+                            logger.warning("Worker %s exited, rebalancing its accounts", worker_id)
+                            self.ring.remove(worker_id)
+                        self.spawn(worker_id)
+                        continue
+                    if worker_id not in self.ring.nodes and await self.is_healthy(client, worker_id):
+                        logger.info("Worker %s is healthy, adding it to the ring", worker_id)
+                        self.ring.add(worker_id)
+                await asyncio.sleep(2)
+
+    def stop(self):
+        for process in self.processes.values():
+            process.terminate()
+        for process in self.processes.values():
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def create_supervisor_app(supervisor: Supervisor) -> FastAPI:
+    """Front end that routes /meta/* requests to the worker owning the account"""
+    client: httpx.AsyncClient | None = None
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        nonlocal client
+        setup_logging()
+        client = httpx.AsyncClient(timeout=60.0, limits=httpx.Limits(max_keepalive_connections=20))
+        monitor = asyncio.create_task(supervisor.monitor_loop())
+        try:
+            yield
+        finally:
+            monitor.cancel()
+            await asyncio.gather(monitor, return_exceptions=True)
+            await client.aclose()
+            await asyncio.to_thread(supervisor.stop)
+            shutdown_logging()
+
+    app = FastAPI(title="SM Agent Supervisor", version="0.1.0", lifespan=lifespan)
+
+    @app.get("/healthz")
+    def healthz():
+        return {"status": "ok", "workers": sorted(supervisor.ring.nodes)}
+
+    @app.get("/cluster/ring")
+    def cluster_ring():
+        """Current ring membership, polled by workers to decide which accounts they sync"""
+        return {"workers": sorted(supervisor.ring.nodes), "replicas": supervisor.ring.replicas}
+
+    @app.api_route("/meta/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
+    async def proxy_meta(path: str, request: Request):
+        worker_id = supervisor.owner(request.query_params.get("account_id"))
+        if worker_id is None:
+            return JSONResponse({"status": "error", "message": "No agent workers available"}, status_code=503)
+
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS}
+        upstream = client.build_request(
+            request.method,
+            f"{supervisor.worker_url(worker_id)}/meta/{path}",
+            params=request.query_params,
+            headers=headers,
+            content=await request.body(),
+        )
+        try:
+            resp = await client.send(upstream, stream=True)
+        except httpx.HTTPError as e:
+            return JSONResponse({"status": "error", "message": f"Worker {worker_id} unavailable: {str(e)}"}, status_code=502)
+
+        return StreamingResponse(
+            resp.aiter_raw(),
+            status_code=resp.status_code,
+            headers={k: v for k, v in resp.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS},
+            background=BackgroundTask(resp.aclose),
+        )
+
+    return app
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark agent import, startup and shutdown time.
+Usage: python bench_startup.py [--runs 10]
+
+Each run happens in a fresh interpreter so module caches do not hide import
+cost. Startup/shutdown drive the app's lifespan against a throwaway config,
+selected with AGENT_CONFIG_PATH so a local dev config is never picked up
+(the CRM URL points at a closed port, so background loops just fail fast).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+AGENT_DIR = Path(__file__).parent
+
+RUN_ONCE = r"""
+import asyncio, json, sys, time
+sys.path.insert(0, {agent_dir!r})
+
+t0 = time.perf_counter()
+from app.main import app
+t1 = time.perf_counter()
+
+async def cycle():
+    async with app.router.lifespan_context(app):
+        t2 = time.perf_counter()
+    return t2, time.perf_counter()
+
+t2_start = time.perf_counter()
+t2, t3 = asyncio.run(cycle())
+print(json.dumps({{"import": t1 - t0, "startup": t2 - t2_start, "shutdown": t3 - t2}}))
+"""
+
+
+def write_bench_config(directory: Path) -> Path:
+    config_path = directory / "meta_config.json"
+    with open(config_path, "w") as f:
+        json.dump({
+            "meta_api": {
+                "app_id": "bench",
+                "app_secret": "bench",
+                "access_token": "bench",
+                "ad_account_id": "0",
+                "base_url": "http://127.0.0.1:9",
+                "timeout": 1
+            },
+            "agent": {"id": "agt_bench", "token": "bench"},
+            "crm": {"base_url": "http://127.0.0.1:9"}
+        }, f)
+    return config_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark agent import and startup time")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    samples = {"import": [], "startup": [], "shutdown": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env["AGENT_CONFIG_PATH"] = str(write_bench_config(Path(tmp)))
+        code = RUN_ONCE.format(agent_dir=str(AGENT_DIR))
+        for _ in range(args.runs):
+            out = subprocess.run(
+                [sys.executable, "-c", code],
+                cwd=tmp, env=env, capture_output=True, text=True, check=True
+            )
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            for name, value in result.items():
+                samples[name].append(value * 1000)
+
+    for name, values in samples.items():
+        print(f"{name:>8}: median {statistics.median(values):8.1f} ms   min {min(values):8.1f} ms   max {max(values):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Export Meta insights as columnar files, one partition per day.
+Usage: python export_insights.py --since 2024-01-01 --until 2024-01-31 [--level ad] [--format parquet] [--out exports]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add the app directory to the path
+sys.path.insert(0, str(Path(__file__).parent / 'app'))
+
+
+def main():
+    from meta_client import MetaAPIClient, find_config_path
+    from insights_export import LEVEL_ID_FIELDS, write_arrow_partitions, write_parquet_partitions
+
+    parser = argparse.ArgumentParser(description="Export Meta insights as Parquet or Arrow IPC files")
+    parser.add_argument("--since", required=True, help="First day to export (YYYY-MM-DD)")
+    parser.add_argument("--until", required=True, help="Last day to export, inclusive (YYYY-MM-DD)")
+    parser.add_argument("--level", default="ad", choices=list(LEVEL_ID_FIELDS))
+    parser.add_argument("--format", default="parquet", choices=["parquet", "arrow"])
+    parser.add_argument("--out", default="exports", help="Output directory")
+    parser.add_argument("--config", help="Path to meta_config.json")
+    args = parser.parse_args()
+
+    meta_client = MetaAPIClient(config_path=args.config or find_config_path())
+
+    writer = write_parquet_partitions if args.format == "parquet" else write_arrow_partitions
+    for path in writer(meta_client, args.level, args.since, args.until, args.out):
+        print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
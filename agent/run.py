@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 """
 Standalone runner for the agent.
-Usage: python run.py
+Usage: python run.py [--workers N]
+
+With --workers N > 1 a supervisor spawns N worker processes, shards ad accounts
+across them by consistent hashing and proxies /meta/* to the owning worker.
 """
+import argparse
 import sys
 from pathlib import Path
 
@@ -10,10 +14,23 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent / 'app'))
 
 if __name__ == "__main__":
-    from app.main import app
     import uvicorn
-    
-    print("Starting agent on http://0.0.0.0:9000")
-    print("Make sure the backend is running on http://localhost:8000")
-    uvicorn.run(app, host="0.0.0.0", port=9000)
 
+    parser = argparse.ArgumentParser(description="Run the SM agent")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--worker-base-port", type=int, default=9100)
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        from app.sharding import Supervisor, create_supervisor_app
+
+        supervisor = Supervisor(args.workers, base_port=args.worker_base_port, supervisor_url=f"http://127.0.0.1:{args.port}")
+        app = create_supervisor_app(supervisor)
+        print(f"Starting agent supervisor with {args.workers} workers on http://0.0.0.0:{args.port}")
+    else:
+        from app.main import app
+        print(f"Starting agent on http://0.0.0.0:{args.port}")
+
+    print("Make sure the backend is running on http://localhost:8000")
+    uvicorn.run(app, host="0.0.0.0", port=args.port)
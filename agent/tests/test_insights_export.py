@@ -0,0 +1,98 @@
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'app'))
+
+from insights_export import INT_COLUMNS, FLOAT_COLUMNS, iter_daily_batches, parse_date_range, rows_to_batch, schema_for_level, stream_arrow_ipc
+
+
+class FakeMetaClient:
+    """Serves canned insights rows per day and records the days requested"""
+
+    def __init__(self, rows_per_day):
+        self.rows_per_day = rows_per_day
+        self.calls = []
+
+    def get_insights_daily(self, level, since, until, fields):
+        self.calls.append((level, since, until))
+        for i in range(self.rows_per_day.get(since, 0)):
+            yield {"campaign_id": f"c{i}", "campaign_name": f"Campaign {i}", "impressions": str(100 * i), "spend": "1.25"}
+
+
+def test_rows_to_batch_parses_numbers_and_keeps_blanks_null():
+    rows = [
+        {"campaign_id": "c1", "campaign_name": "A", "impressions": "1200", "clicks": "7", "reach": "", "spend": "3.50", "ctr": "0.583"},
+        {"campaign_id": "c2", "campaign_name": "B", "impressions": "15.0", "clicks": None, "spend": "abc"},
+    ]
+    batch = rows_to_batch("campaign", date(2024, 3, 1), rows)
+
+    assert batch.schema == schema_for_level("campaign")
+    assert batch.schema.field("impressions").type == pa.int64()
+    assert batch.schema.field("spend").type == pa.float64()
+    data = batch.to_pydict()
+    assert data["date"] == [date(2024, 3, 1)] * 2
+    assert data["impressions"] == [1200, 15]
+    assert data["clicks"] == [7, None]
+    assert data["reach"] == [None, None]
+    assert data["spend"] == [3.5, None]
+    assert data["ctr"] == [0.583, None]
+    # Columns missing from every row are still present, as nulls
+    assert data["cpm"] == [None, None]
+    assert set(INT_COLUMNS + FLOAT_COLUMNS) <= set(data)
+
+
+def test_one_batch_per_day_across_inclusive_range():
+    client = FakeMetaClient({"2024-02-28": 2, "2024-03-01": 1})
+    batches = list(iter_daily_batches(client, "campaign", "2024-02-28", "2024-03-01"))
+
+    assert [day for day, _ in batches] == [date(2024, 2, 28), date(2024, 2, 29), date(2024, 3, 1)]
+    assert [batch.num_rows for _, batch in batches] == [2, 0, 1]
+    assert [call[1:] for call in client.calls] == [(d, d) for d in ("2024-02-28", "2024-02-29", "2024-03-01")]
+
+
+def test_fetches_go_through_the_run_hook():
+    client = FakeMetaClient({"2024-03-01": 1})
+    submitted = []
+
+    def run(fn, *args):
+        submitted.append(args[2])
+        return fn(*args)
+
+    list(iter_daily_batches(client, "campaign", "2024-03-01", "2024-03-02", run=run))
+    assert submitted == ["2024-03-01", "2024-03-02"]
+
+
+def test_until_before_since_is_rejected():
+    with pytest.raises(ValueError):
+        parse_date_range("2024-03-02", "2024-03-01")
+    with pytest.raises(ValueError):
+        list(iter_daily_batches(FakeMetaClient({}), "campaign", "2024-03-02", "2024-03-01"))
+
+
+def test_range_cap():
+    assert parse_date_range("2024-01-01", "2024-01-31", max_days=31) == (date(2024, 1, 1), date(2024, 1, 31))
+    with pytest.raises(ValueError):
+        parse_date_range("2024-01-01", "2024-02-01", max_days=31)
+
+
+def test_invalid_level_is_rejected():
+    with pytest.raises(ValueError):
+        list(iter_daily_batches(FakeMetaClient({}), "account", "2024-03-01", "2024-03-01"))
+
+
+def test_arrow_ipc_stream_reads_back():
+    client = FakeMetaClient({"2024-03-01": 3, "2024-03-02": 0, "2024-03-03": 2})
+    payload = b"".join(stream_arrow_ipc(client, "campaign", "2024-03-01", "2024-03-03"))
+
+    reader = pa.ipc.open_stream(payload)
+    assert reader.schema == schema_for_level("campaign")
+    batches = list(reader)
+    assert [batch.num_rows for batch in batches] == [3, 0, 2]
+    table = pa.Table.from_batches(batches)
+    assert table.column("impressions").to_pylist() == [0, 100, 200, 0, 100]
+    assert table.column("spend").to_pylist() == [1.25] * 5
@@ -0,0 +1,56 @@
+import json
+import logging
+import queue
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'app'))
+
+from logging_setup import DroppingQueueHandler, JsonFormatter, RateLimitFilter
+
+
+def make_record(msg="Handled request", level=logging.INFO, request_id=None, args=None, exc_info=None):
+    record = logging.LogRecord("app", level, __file__, 1, msg, args, exc_info)
+    record.correlation_id = request_id
+    return record
+
+
+def test_correlated_info_records_are_not_rate_limited():
+    limiter = RateLimitFilter(rate=0.0, burst=2)
+    assert all(limiter.filter(make_record(request_id=f"req{i}")) for i in range(10))
+    # Without a correlation id the same template is limited
+    assert [limiter.filter(make_record()) for _ in range(3)] == [True, True, False]
+
+
+def test_trace_sampling_keeps_or_drops_whole_requests():
+    limiter = RateLimitFilter(trace_sample_rate=0.5)
+    decisions = {request_id: limiter.filter(make_record(request_id=request_id)) for request_id in map(str, range(200))}
+    assert 0 < sum(decisions.values()) < 200
+    for request_id, kept in decisions.items():
+        assert limiter.filter(make_record("Graph API call", request_id=request_id)) == kept
+
+
+def test_levels_have_separate_buckets():
+    limiter = RateLimitFilter(rate=0.0, burst=1)
+    assert limiter.filter(make_record("Sync failed", logging.WARNING))
+    assert not limiter.filter(make_record("Sync failed", logging.WARNING))
+    assert limiter.filter(make_record("Sync failed", logging.ERROR))
+
+
+def test_prepare_keeps_traceback_out_of_the_message():
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        record = make_record("Failed for %s", logging.ERROR, args=("acc_1",), exc_info=sys.exc_info())
+
+    handler = DroppingQueueHandler(queue.Queue())
+    prepared = handler.prepare(record)
+    assert prepared.msg == "Failed for acc_1"
+    assert prepared.args is None
+    assert prepared.exc_info is None
+    assert "RuntimeError: boom" in prepared.exc_text
+    assert record.exc_info is not None
+
+    entry = json.loads(JsonFormatter().format(prepared))
+    assert entry["msg"] == "Failed for acc_1"
+    assert "RuntimeError: boom" in entry["exc_info"]
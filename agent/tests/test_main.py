@@ -0,0 +1,237 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'app'))
+
+import main
+from sharding import HashRing
+from starlette.requests import Request
+
+
+def use_worker(monkeypatch, worker_id, workers, accounts=("111", "222", "333", "444")):
+    monkeypatch.setattr(main, "WORKER_ID", worker_id)
+    monkeypatch.setattr(main, "worker_ring", HashRing(workers) if workers is not None else None)
+    monkeypatch.setattr(main, "meta_client", SimpleNamespace(ad_account_id=accounts[0]))
+    monkeypatch.setattr(main, "cred_manager", SimpleNamespace(get_credentials=lambda account_id: {"access_token": "t"}))
+    monkeypatch.setattr(main, "current_ad_accounts", [{"meta_ad_account_id": f"act_{account}"} for account in accounts[1:]])
+
+
+def test_worker_outside_the_ring_waits_for_membership(monkeypatch):
+    use_worker(monkeypatch, "w1", ["w0"])
+    monkeypatch.setattr(main, "RING_REFRESH_SECONDS", 0.02)
+
+    async def body():
+        waiter = asyncio.create_task(main.wait_for_ring_membership(timeout=2))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        main.worker_ring = HashRing(["w0", "w1"])
+        return await waiter
+
+    assert asyncio.run(body()) is True
+
+
+def test_membership_wait_times_out(monkeypatch):
+    use_worker(monkeypatch, "w1", None)
+    monkeypatch.setattr(main, "RING_REFRESH_SECONDS", 0.02)
+    assert asyncio.run(main.wait_for_ring_membership(timeout=0.05)) is False
+
+
+def test_next_round_starts_early_when_the_ring_changes(monkeypatch):
+    monkeypatch.setattr(main, "RING_REFRESH_SECONDS", 0.02)
+    monkeypatch.setattr(main, "ring_version", 3)
+
+    async def body():
+        waiter = asyncio.create_task(main.wait_for_next_round(60, seen_ring_version=3))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        main.ring_version = 4
+        await asyncio.wait_for(waiter, timeout=1)
+
+    asyncio.run(body())
+
+
+def test_accounts_moved_to_a_worker_are_due_immediately(monkeypatch):
+    use_worker(monkeypatch, "w0", ["w0", "w1"])
+    owned = main.owned_account_ids()
+    last_synced = {account: main.time.monotonic() for account in owned}
+    assert main.due_account_ids(last_synced, 300) == []
+
+    # w1 leaves: its accounts move to w0 and have never been synced here
+    main.worker_ring = HashRing(["w0"])
+    assert sorted(main.due_account_ids(last_synced, 300)) == sorted(set(main.owned_account_ids()) - set(owned))
+    assert len(main.owned_account_ids()) == 4
+
+
+def make_request(path="/meta/campaigns", if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": headers})
+
+
+def use_cache(monkeypatch):
+    monkeypatch.setattr(main, "meta_client", SimpleNamespace(ad_account_id="111"))
+    monkeypatch.setattr(main, "response_cache", {})
+
+
+def test_etag_response_matches_if_none_match():
+    body, etag = b'{"a":1}', '"abc"'
+    assert main.etag_response(make_request(), body, etag).status_code == 200
+    assert main.etag_response(make_request(if_none_match='"abc"'), body, etag).status_code == 304
+    assert main.etag_response(make_request(if_none_match='"x", W/"abc"'), body, etag).status_code == 304
+    assert main.etag_response(make_request(if_none_match="*"), body, etag).status_code == 304
+    assert main.etag_response(make_request(if_none_match='"abd"'), body, etag).status_code == 200
+
+
+def test_conditional_json_etag_and_304(monkeypatch):
+    use_cache(monkeypatch)
+    first = main.conditional_json(make_request(), None, {"status": "success", "data": [1]})
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "no-cache"
+
+    again = main.conditional_json(make_request(if_none_match=etag), None, {"status": "success", "data": [1]})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+    changed = main.conditional_json(make_request(if_none_match=etag), None, {"status": "success", "data": [2]})
+    assert changed.status_code == 200
+
+
+def test_etag_source_ignores_volatile_fields(monkeypatch):
+    use_cache(monkeypatch)
+    first = main.conditional_json(make_request(), None, {"data": [1], "last_updated": "t1"}, etag_source=[1])
+    second = main.conditional_json(make_request(), None, {"data": [1], "last_updated": "t2"}, etag_source=[1])
+    assert first.headers["etag"] == second.headers["etag"]
+
+
+def test_cached_response_until_expiry(monkeypatch):
+    use_cache(monkeypatch)
+    assert main.cached_response(make_request(), "act_111") is None
+    etag = main.conditional_json(make_request(), None, {"data": [1]}).headers["etag"]
+
+    # Same account with or without the act_ prefix, conditional or not
+    assert main.cached_response(make_request(if_none_match=etag), "act_111").status_code == 304
+    assert main.cached_response(make_request(), "111").body == b'{"data":[1]}'
+    assert main.cached_response(make_request("/meta/insights"), None) is None
+
+    key = ("111", "/meta/campaigns")
+    stored_at, body, etag = main.response_cache[key]
+    main.response_cache[key] = (stored_at - main.RESPONSE_CACHE_TTL - 1, body, etag)
+    assert main.cached_response(make_request(), None) is None
+
+
+def test_mutation_invalidates_the_account(monkeypatch):
+    use_cache(monkeypatch)
+    main.conditional_json(make_request(), "111", {"data": [1]})
+    main.conditional_json(make_request("/meta/campaigns/hierarchical"), "111", {"data": [1]})
+    main.conditional_json(make_request(), "222", {"data": [2]})
+
+    main.invalidate_response_cache("act_111")
+    assert main.cached_response(make_request(), "111") is None
+    assert main.cached_response(make_request("/meta/campaigns/hierarchical"), "111") is None
+    assert main.cached_response(make_request(), "222") is not None
+
+
+def test_connection_test_endpoints_are_not_cached(monkeypatch):
+    use_cache(monkeypatch)
+    connected = [True]
+    client = SimpleNamespace(
+        ad_account_id="111",
+        test_connection=lambda: connected[0],
+        get_ad_account_info=lambda: {"id": "act_111"},
+        get_campaigns=lambda limit=100: [],
+        get_campaigns_detailed=lambda limit=100: [],
+    )
+
+    async def run(priority, fn, *args, key=None, **kwargs):
+        return fn(*args, **kwargs)
+
+    monkeypatch.setattr(main, "meta_client", client)
+    monkeypatch.setattr(main, "scheduler", SimpleNamespace(run=run))
+
+    for endpoint, path in ((main.test_simple_campaigns, "/meta/test/simple"), (main.test_hierarchical_structure, "/meta/test/hierarchical")):
+        connected[0] = True
+        assert asyncio.run(endpoint(make_request(path), None)).status_code == 200
+        connected[0] = False
+        assert asyncio.run(endpoint(make_request(path), None)) == {"status": "error", "message": "Meta API connection failed"}
+    assert main.response_cache == {}
+
+
+def test_superseded_sync_round_is_shipped_once(monkeypatch):
+    from scheduler import MetaScheduler, Priority
+    import threading
+
+    release = threading.Event()
+    posted = []
+
+    async def post(client, path, json=None):
+        posted.append((path, json))
+
+    def collect(account_id):
+        return {"campaigns": [], "account": account_id}
+
+    async def body():
+        scheduler = MetaScheduler(limits={Priority.INTERACTIVE: 1, Priority.READ: 1, Priority.BACKGROUND: 1})
+        scheduler.start()
+        monkeypatch.setattr(main, "scheduler", scheduler)
+        try:
+            blocker = scheduler.submit(Priority.BACKGROUND, release.wait, 5)
+            await asyncio.sleep(0.05)
+            shipped = {}
+            # Two rounds submitted while the first round's job is still queued
+            rounds = [asyncio.create_task(main.sync_account_meta_data(None, "111", shipped)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            release.set()
+            await blocker
+            await asyncio.gather(*rounds)
+            return scheduler.stats[Priority.BACKGROUND].superseded
+        finally:
+            release.set()
+            await scheduler.stop()
+
+    monkeypatch.setattr(main, "post", post)
+    monkeypatch.setattr(main, "collect_sync_data", collect)
+    assert asyncio.run(body()) == 1
+    assert len(posted) == 1
+
+
+def test_failed_startup_flushes_logs(monkeypatch, capsys):
+    import logging
+    import logging_setup
+
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+
+    def init_config():
+        for _ in range(200):
+            main.logger.error("Invalid credentials")
+        return False
+
+    monkeypatch.setattr(main, "init_config", init_config)
+    monkeypatch.setattr(main, "init_credentials", lambda: SimpleNamespace())
+    monkeypatch.setattr(main, "MetaAPIClient", lambda path: SimpleNamespace(ad_account_id="111"))
+
+    async def start():
+        async with main.lifespan(main.app):
+            pass
+
+    try:
+        try:
+            asyncio.run(start())
+        except RuntimeError as e:
+            assert "Invalid credentials" in str(e)
+        else:
+            raise AssertionError("startup should fail")
+
+        assert logging_setup._listener is None
+        # Records logged after the failure (uvicorn's own report) are still written
+        logging.getLogger("uvicorn.error").error("Application startup failed. Exiting.")
+        lines = capsys.readouterr().out.splitlines()
+    finally:
+        root.handlers, root.level = saved_handlers, saved_level
+
+    messages = [json.loads(line)["msg"] for line in lines]
+    # The rate limiter lets the burst through and the queue is flushed before exit
+    assert messages.count("Invalid credentials") == 50
+    assert messages[-1] == "Application startup failed. Exiting."
@@ -0,0 +1,92 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'app'))
+
+from rollups import DailyRollup, parse_insights_row
+
+
+RAW_ROWS = [
+    # campaign c1 / ad set s1
+    {"date_start": "2024-03-01", "campaign_id": "c1", "adset_id": "s1", "ad_id": "a1",
+     "impressions": "1000", "clicks": "10", "spend": "1.005",
+     "conversions": [{"action_type": "purchase", "value": "2"}, {"action_type": "lead", "value": "1"}]},
+    {"date_start": "2024-03-01", "campaign_id": "c1", "adset_id": "s1", "ad_id": "a2",
+     "impressions": "500", "clicks": "5", "spend": "2.50"},
+    # campaign c1 / ad set s2
+    {"date_start": "2024-03-01", "campaign_id": "c1", "adset_id": "s2", "ad_id": "a3",
+     "impressions": "250", "clicks": "1", "spend": "0.10",
+     "conversions": [{"action_type": "purchase", "value": "4"}]},
+    # next day for a1
+    {"date_start": "2024-03-02", "campaign_id": "c1", "adset_id": "s1", "ad_id": "a1",
+     "impressions": "300", "clicks": "3", "spend": "0.995"},
+    # campaign c2
+    {"date_start": "2024-03-01", "campaign_id": "c2", "adset_id": "s3", "ad_id": "a4",
+     "impressions": "40", "clicks": "0", "spend": "0"},
+]
+
+
+def build_rollup():
+    rollup = DailyRollup()
+    for row in RAW_ROWS:
+        rollup.add_insights_row(row)
+    return rollup
+
+
+def totals(rollup, scope, meta_id, date):
+    return rollup.totals[(scope, meta_id, date)]
+
+
+def test_spend_minor_rounds_half_up():
+    assert parse_insights_row({"spend": "1.005"})["spend_minor"] == 101
+    assert parse_insights_row({"spend": "0.995"})["spend_minor"] == 100
+    assert parse_insights_row({"spend": "2.50"})["spend_minor"] == 250
+    assert parse_insights_row({})["spend_minor"] == 0
+
+
+def test_conversions_sum_action_values():
+    row = {"conversions": [{"action_type": "purchase", "value": "2"}, {"action_type": "lead", "value": "1"}, {"value": "x"}]}
+    assert parse_insights_row(row)["conversions"] == 3
+    assert parse_insights_row({"conversions": None})["conversions"] == 0
+
+
+def test_ad_totals_match_raw_rows():
+    rollup = build_rollup()
+    assert totals(rollup, "AD", "a1", "2024-03-01") == {"impressions": 1000, "clicks": 10, "spend_minor": 101, "conversions": 3}
+    assert totals(rollup, "AD", "a1", "2024-03-02") == {"impressions": 300, "clicks": 3, "spend_minor": 100, "conversions": 0}
+
+
+def test_ad_set_totals_sum_their_ads():
+    rollup = build_rollup()
+    # a1 + a2 on 2024-03-01
+    assert totals(rollup, "AD_SET", "s1", "2024-03-01") == {"impressions": 1500, "clicks": 15, "spend_minor": 351, "conversions": 3}
+    assert totals(rollup, "AD_SET", "s2", "2024-03-01") == {"impressions": 250, "clicks": 1, "spend_minor": 10, "conversions": 4}
+
+
+def test_campaign_totals_sum_their_ads_per_day():
+    rollup = build_rollup()
+    # a1 + a2 + a3 on 2024-03-01
+    assert totals(rollup, "CAMPAIGN", "c1", "2024-03-01") == {"impressions": 1750, "clicks": 16, "spend_minor": 361, "conversions": 7}
+    assert totals(rollup, "CAMPAIGN", "c1", "2024-03-02") == {"impressions": 300, "clicks": 3, "spend_minor": 100, "conversions": 0}
+    assert totals(rollup, "CAMPAIGN", "c2", "2024-03-01") == {"impressions": 40, "clicks": 0, "spend_minor": 0, "conversions": 0}
+
+
+def test_scope_totals_agree_with_raw_data():
+    rollup = build_rollup()
+    raw_impressions = sum(int(row["impressions"]) for row in RAW_ROWS)
+    for scope in ("AD", "AD_SET", "CAMPAIGN"):
+        assert sum(item["impressions"] for item in rollup.items(scope)) == raw_impressions
+
+
+def test_payloads_group_items_by_scope():
+    payloads = build_rollup().payloads("acc_1")
+    assert [payload["scope"] for payload in payloads] == ["AD", "AD_SET", "CAMPAIGN"]
+    assert all(payload["ad_account_id"] == "acc_1" for payload in payloads)
+    assert len(payloads[0]["items"]) == 5
+    assert {"meta_id": "s2", "date": "2024-03-01", "impressions": 250, "clicks": 1, "spend_minor": 10, "conversions": 4} in payloads[1]["items"]
+
+
+def test_rows_without_date_are_ignored():
+    rollup = DailyRollup()
+    rollup.add_insights_row({"ad_id": "a1", "impressions": "5"})
+    assert len(rollup) == 0
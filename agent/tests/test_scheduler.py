@@ -0,0 +1,183 @@
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'app'))
+
+from scheduler import MetaScheduler, Priority
+
+
+def blocking(release: threading.Event, value=None):
+    release.wait(timeout=5)
+    return value
+
+
+def run_with_scheduler(test, **kwargs):
+    """Run an async test body against a started scheduler, then stop it"""
+    async def main():
+        scheduler = MetaScheduler(**kwargs)
+        scheduler.start()
+        try:
+            return await test(scheduler)
+        finally:
+            await scheduler.stop()
+    return asyncio.run(main())
+
+
+def test_interactive_starts_while_lower_classes_are_saturated():
+    release = threading.Event()
+
+    async def body(scheduler):
+        try:
+            waiting = [scheduler.submit(Priority.READ, blocking, release) for _ in range(6)]
+            waiting += [scheduler.submit(Priority.BACKGROUND, blocking, release) for _ in range(4)]
+            await asyncio.sleep(0.1)
+            assert scheduler.stats[Priority.READ].running == 4
+            assert scheduler.stats[Priority.BACKGROUND].running == 2
+
+            result = await asyncio.wait_for(scheduler.run(Priority.INTERACTIVE, lambda: "done"), timeout=1)
+            assert result == "done"
+            # The lower classes were still blocked when the mutation went through
+            assert not any(future.done() for future in waiting)
+        finally:
+            release.set()
+        await asyncio.gather(*waiting)
+
+    run_with_scheduler(body)
+
+
+def test_global_cap_applies_to_read_and_background_only():
+    release = threading.Event()
+
+    async def body(scheduler):
+        try:
+            waiting = [scheduler.submit(Priority.READ, blocking, release) for _ in range(2)]
+            waiting += [scheduler.submit(Priority.BACKGROUND, blocking, release) for _ in range(2)]
+            waiting += [scheduler.submit(Priority.INTERACTIVE, blocking, release) for _ in range(2)]
+            await asyncio.sleep(0.1)
+            running = {priority: scheduler.stats[priority].running for priority in Priority}
+            assert running[Priority.READ] + running[Priority.BACKGROUND] == 3
+            assert running[Priority.INTERACTIVE] == 2
+        finally:
+            release.set()
+        await asyncio.gather(*waiting)
+
+    run_with_scheduler(body, max_concurrency=3)
+
+
+def test_keyed_reads_supersede_queued_duplicates():
+    release = threading.Event()
+    calls = []
+
+    def fetch(value):
+        calls.append(value)
+        return value
+
+    async def body(scheduler):
+        try:
+            blocker = scheduler.submit(Priority.READ, blocking, release)
+            await asyncio.sleep(0.05)
+            first = scheduler.submit(Priority.READ, fetch, "old", key="hierarchical:1")
+            second = scheduler.submit(Priority.READ, fetch, "new", key="hierarchical:1")
+        finally:
+            release.set()
+        await blocker
+        assert await first == "new"
+        assert await second == "new"
+        assert calls == ["new"]
+        assert scheduler.stats[Priority.READ].superseded == 1
+
+    run_with_scheduler(body, limits={Priority.INTERACTIVE: 1, Priority.READ: 1, Priority.BACKGROUND: 1})
+
+
+def test_interactive_jobs_are_never_merged():
+    release = threading.Event()
+    calls = []
+
+    async def body(scheduler):
+        try:
+            blocker = scheduler.submit(Priority.INTERACTIVE, blocking, release)
+            await asyncio.sleep(0.05)
+            first = scheduler.submit(Priority.INTERACTIVE, calls.append, "PAUSED", key="adset:1")
+            second = scheduler.submit(Priority.INTERACTIVE, calls.append, "ACTIVE", key="adset:1")
+        finally:
+            release.set()
+        await asyncio.gather(blocker, first, second)
+        assert calls == ["PAUSED", "ACTIVE"]
+        assert scheduler.stats[Priority.INTERACTIVE].superseded == 0
+
+    run_with_scheduler(body, limits={Priority.INTERACTIVE: 1, Priority.READ: 1, Priority.BACKGROUND: 1})
+
+
+def test_cancelling_a_superseding_waiter_keeps_the_other_alive():
+    release = threading.Event()
+    calls = []
+
+    def fetch(value):
+        calls.append(value)
+        return value
+
+    async def body(scheduler):
+        try:
+            blocker = scheduler.submit(Priority.READ, blocking, release)
+            await asyncio.sleep(0.05)
+            first = asyncio.create_task(scheduler.run(Priority.READ, fetch, "campaigns", key="campaigns:1"))
+            second = asyncio.create_task(scheduler.run(Priority.READ, fetch, "campaigns", key="campaigns:1"))
+            await asyncio.sleep(0.01)
+            # e.g. the second client disconnected
+            second.cancel()
+            await asyncio.sleep(0.01)
+        finally:
+            release.set()
+        await blocker
+        assert await first == "campaigns"
+        assert second.cancelled()
+        assert calls == ["campaigns"]
+
+    run_with_scheduler(body, limits={Priority.INTERACTIVE: 1, Priority.READ: 1, Priority.BACKGROUND: 1})
+
+
+def test_cancelling_the_original_waiter_keeps_the_superseding_one_alive():
+    release = threading.Event()
+
+    async def body(scheduler):
+        try:
+            blocker = scheduler.submit(Priority.BACKGROUND, blocking, release)
+            await asyncio.sleep(0.05)
+            first = asyncio.create_task(scheduler.run(Priority.BACKGROUND, lambda: "old", key="sync:1"))
+            second = asyncio.create_task(scheduler.run(Priority.BACKGROUND, lambda: "new", key="sync:1"))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            await asyncio.sleep(0.01)
+        finally:
+            release.set()
+        await blocker
+        assert await second == "new"
+        assert first.cancelled()
+        assert scheduler.stats[Priority.BACKGROUND].superseded == 1
+
+    run_with_scheduler(body, limits={Priority.INTERACTIVE: 1, Priority.READ: 1, Priority.BACKGROUND: 1})
+
+
+def test_job_is_dropped_once_every_waiter_is_gone():
+    release = threading.Event()
+    calls = []
+
+    async def body(scheduler):
+        try:
+            blocker = scheduler.submit(Priority.READ, blocking, release)
+            await asyncio.sleep(0.05)
+            waiters = [asyncio.create_task(scheduler.run(Priority.READ, calls.append, "x", key="insights:1")) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            for waiter in waiters:
+                waiter.cancel()
+            await asyncio.sleep(0.01)
+        finally:
+            release.set()
+        await blocker
+        # Give the dispatcher a chance to pick the queue up again
+        await scheduler.run(Priority.READ, lambda: None)
+        assert calls == []
+
+    run_with_scheduler(body, limits={Priority.INTERACTIVE: 1, Priority.READ: 1, Priority.BACKGROUND: 1})
@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'app'))
+
+from sharding import HashRing, normalize_account_id
+
+
+ACCOUNTS = [str(1000000 + i) for i in range(500)]
+
+
+def assignment(ring):
+    return {account: ring.get(account) for account in ACCOUNTS}
+
+
+def test_empty_ring_has_no_owner():
+    ring = HashRing()
+    assert ring.get("123") is None
+    ring.add("w0")
+    ring.remove("w0")
+    assert ring.get("123") is None
+
+
+def test_adding_a_worker_only_moves_accounts_to_it():
+    ring = HashRing(["w0", "w1", "w2"])
+    before = assignment(ring)
+    ring.add("w3")
+    after = assignment(ring)
+
+    moved = [account for account in ACCOUNTS if before[account] != after[account]]
+    assert moved
+    assert all(after[account] == "w3" for account in moved)
+    # Roughly a quarter of the accounts, not a reshuffle
+    assert len(moved) < len(ACCOUNTS) / 2
+
+
+def test_removing_a_worker_only_moves_its_accounts():
+    ring = HashRing(["w0", "w1", "w2"])
+    before = assignment(ring)
+    ring.remove("w1")
+    after = assignment(ring)
+
+    for account in ACCOUNTS:
+        if before[account] == "w1":
+            assert after[account] in ("w0", "w2")
+        else:
+            assert after[account] == before[account]
+
+
+def test_membership_changes_are_idempotent_and_reversible():
+    ring = HashRing(["w0", "w1"])
+    before = assignment(ring)
+    ring.add("w1")
+    ring.remove("w9")
+    assert assignment(ring) == before
+    ring.add("w2")
+    ring.remove("w2")
+    assert assignment(ring) == before
+
+
+def test_act_prefix_does_not_change_the_owner():
+    ring = HashRing(["w0", "w1", "w2"])
+    assert normalize_account_id("act_123") == normalize_account_id("123") == "123"
+    for account in ACCOUNTS[:50]:
+        assert ring.get(normalize_account_id(f"act_{account}")) == ring.get(normalize_account_id(account))
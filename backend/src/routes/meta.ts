@@ -3,10 +3,46 @@ import { Agent } from '../models';
 import { authenticate, requireRoles, AuthRequest, verifyAgentRequest } from '../middleware/auth';
 import { config } from '../config';
 import axios from 'axios';
+import http from 'http';
+import https from 'https';
 
 const router = Router();
 
-async function getAgentMetaData(agentId: string, endpoint: string): Promise<any> {
+// Pooled keep-alive connections to the agent instead of a new socket per dashboard call
+const agentClient = axios.create({
+  timeout: 10000,
+  httpAgent: new http.Agent({ keepAlive: true, maxSockets: 50 }),
+  httpsAgent: new https.Agent({ keepAlive: true, maxSockets: 50 }),
+  // 304 Not Modified is an expected answer to a conditional request
+  validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+});
+
+// Last response per agent URL, revalidated with If-None-Match
+const AGENT_CACHE_MAX_ENTRIES = 500;
+const agentResponseCache = new Map<string, { etag: string; data: any }>();
+
+function cacheAgentResponse(url: string, etag: string, data: any) {
+  agentResponseCache.delete(url);
+  agentResponseCache.set(url, { etag, data });
+  if (agentResponseCache.size > AGENT_CACHE_MAX_ENTRIES) {
+    const oldest = agentResponseCache.keys().next().value;
+    if (oldest !== undefined) {
+      agentResponseCache.delete(oldest);
+    }
+  }
+}
+
+// Agent URL for a /meta/* endpoint; account_id lets a sharded agent route to the owning worker
+function agentMetaUrl(endpoint: string, accountId?: string): string {
+  const url = `${config.agent.baseUrl}/meta/${endpoint}`;
+  return accountId ? `${url}?account_id=${encodeURIComponent(accountId)}` : url;
+}
+
+function queryAccountId(value: unknown): string | undefined {
+  return typeof value === 'string' && value ? value : undefined;
+}
+
+async function getAgentMetaData(agentId: string, endpoint: string, accountId?: string): Promise<any> {
   const agent = await Agent.findOne({ id: agentId });
   
   if (!agent) {
@@ -18,8 +54,23 @@ async function getAgentMetaData(agentId: string, endpoint: string): Promise<any>
   }
 
   try {
-    const agentUrl = `${config.agent.baseUrl}/meta/${endpoint}`;
-    const response = await axios.get(agentUrl, { timeout: 10000 });
+    const agentUrl = agentMetaUrl(endpoint, accountId);
+    const cacheKey = `${agentId}:${agentUrl}`;
+    const cached = agentResponseCache.get(cacheKey);
+    const response = await agentClient.get(agentUrl, {
+      headers: cached ? { 'If-None-Match': cached.etag } : undefined,
+    });
+
+    if (response.status === 304 && cached) {
+      return cached.data;
+    }
+
+    const etag = response.headers['etag'];
+    if (etag) {
+      cacheAgentResponse(cacheKey, etag, response.data);
+    } else {
+      agentResponseCache.delete(cacheKey);
+    }
     return response.data;
   } catch (error: any) {
     if (error.code === 'ECONNABORTED') {
@@ -35,7 +86,7 @@ async function getAgentMetaData(agentId: string, endpoint: string): Promise<any>
   }
 }
 
-async function updateAgentMetaData(agentId: string, endpoint: string, data: any): Promise<any> {
+async function updateAgentMetaData(agentId: string, endpoint: string, data: any, accountId?: string): Promise<any> {
   const agent = await Agent.findOne({ id: agentId });
   
   if (!agent) {
@@ -47,8 +98,8 @@ async function updateAgentMetaData(agentId: string, endpoint: string, data: any)
   }
 
   try {
-    const agentUrl = `${config.agent.baseUrl}/meta/${endpoint}`;
-    const response = await axios.put(agentUrl, data, { timeout: 10000 });
+    const agentUrl = agentMetaUrl(endpoint, accountId);
+    const response = await agentClient.put(agentUrl, data);
     
     // Check for application-level errors in the response
     if (response.data && response.data.status === 'error') {
@@ -83,11 +134,11 @@ async function updateAgentMetaData(agentId: string, endpoint: string, data: any)
 // Test Meta connection
 router.get('/test', authenticate, requireRoles('USER', 'ADMIN'), async (req: AuthRequest, res: Response) => {
   try {
-    const { agent_id } = req.query;
+    const { agent_id, account_id } = req.query;
     if (!agent_id || typeof agent_id !== 'string') {
       return res.status(400).json({ detail: 'agent_id is required' });
     }
-    const data = await getAgentMetaData(agent_id, 'test');
+    const data = await getAgentMetaData(agent_id, 'test', queryAccountId(account_id));
     res.json(data);
   } catch (error: any) {
     if (error.message === 'Agent not found') {
@@ -109,11 +160,11 @@ router.get('/test', authenticate, requireRoles('USER', 'ADMIN'), async (req: Aut
 // Get Meta account
 router.get('/account', authenticate, requireRoles('USER', 'ADMIN'), async (req: AuthRequest, res: Response) => {
   try {
-    const { agent_id } = req.query;
+    const { agent_id, account_id } = req.query;
     if (!agent_id || typeof agent_id !== 'string') {
       return res.status(400).json({ detail: 'agent_id is required' });
     }
-    const data = await getAgentMetaData(agent_id, 'account');
+    const data = await getAgentMetaData(agent_id, 'account', queryAccountId(account_id));
     res.json(data);
   } catch (error: any) {
     if (error.message === 'Agent not found') {
@@ -135,11 +186,11 @@ router.get('/account', authenticate, requireRoles('USER', 'ADMIN'), async (req:
 // Get Meta campaigns
 router.get('/campaigns', authenticate, requireRoles('USER', 'ADMIN'), async (req: AuthRequest, res: Response) => {
   try {
-    const { agent_id } = req.query;
+    const { agent_id, account_id } = req.query;
     if (!agent_id || typeof agent_id !== 'string') {
       return res.status(400).json({ detail: 'agent_id is required' });
     }
-    const data = await getAgentMetaData(agent_id, 'campaigns');
+    const data = await getAgentMetaData(agent_id, 'campaigns', queryAccountId(account_id));
     res.json(data);
   } catch (error: any) {
     if (error.message === 'Agent not found') {
@@ -161,11 +212,11 @@ router.get('/campaigns', authenticate, requireRoles('USER', 'ADMIN'), async (req
 // Get Meta insights
 router.get('/insights', authenticate, requireRoles('USER', 'ADMIN'), async (req: AuthRequest, res: Response) => {
   try {
-    const { agent_id } = req.query;
+    const { agent_id, account_id } = req.query;
     if (!agent_id || typeof agent_id !== 'string') {
       return res.status(400).json({ detail: 'agent_id is required' });
     }
-    const data = await getAgentMetaData(agent_id, 'insights');
+    const data = await getAgentMetaData(agent_id, 'insights', queryAccountId(account_id));
     res.json(data);
   } catch (error: any) {
     if (error.message === 'Agent not found') {
@@ -187,11 +238,11 @@ router.get('/insights', authenticate, requireRoles('USER', 'ADMIN'), async (req:
 // Get hierarchical campaigns
 router.get('/campaigns/hierarchical', authenticate, requireRoles('USER', 'ADMIN'), async (req: AuthRequest, res: Response) => {
   try {
-    const { agent_id } = req.query;
+    const { agent_id, account_id } = req.query;
     if (!agent_id || typeof agent_id !== 'string') {
       return res.status(400).json({ detail: 'agent_id is required' });
     }
-    const data = await getAgentMetaData(agent_id, 'campaigns/hierarchical');
+    const data = await getAgentMetaData(agent_id, 'campaigns/hierarchical', queryAccountId(account_id));
     res.json(data);
   } catch (error: any) {
     if (error.message === 'Agent not found') {
@@ -213,12 +264,12 @@ router.get('/campaigns/hierarchical', authenticate, requireRoles('USER', 'ADMIN'
 // Get campaign ad sets
 router.get('/campaigns/:campaign_id/adsets', authenticate, requireRoles('USER', 'ADMIN'), async (req: AuthRequest, res: Response) => {
   try {
-    const { agent_id } = req.query;
+    const { agent_id, account_id } = req.query;
     const { campaign_id } = req.params;
     if (!agent_id || typeof agent_id !== 'string') {
       return res.status(400).json({ detail: 'agent_id is required' });
     }
-    const data = await getAgentMetaData(agent_id, `campaigns/${campaign_id}/adsets`);
+    const data = await getAgentMetaData(agent_id, `campaigns/${campaign_id}/adsets`, queryAccountId(account_id));
     res.json(data);
   } catch (error: any) {
     if (error.message === 'Agent not found') {
@@ -240,12 +291,12 @@ router.get('/campaigns/:campaign_id/adsets', authenticate, requireRoles('USER',
 // Get ad set ads
 router.get('/adsets/:adset_id/ads', authenticate, requireRoles('USER', 'ADMIN'), async (req: AuthRequest, res: Response) => {
   try {
-    const { agent_id } = req.query;
+    const { agent_id, account_id } = req.query;
     const { adset_id } = req.params;
     if (!agent_id || typeof agent_id !== 'string') {
       return res.status(400).json({ detail: 'agent_id is required' });
     }
-    const data = await getAgentMetaData(agent_id, `adsets/${adset_id}/ads`);
+    const data = await getAgentMetaData(agent_id, `adsets/${adset_id}/ads`, queryAccountId(account_id));
     res.json(data);
   } catch (error: any) {
     if (error.message === 'Agent not found') {
@@ -267,7 +318,7 @@ router.get('/adsets/:adset_id/ads', authenticate, requireRoles('USER', 'ADMIN'),
 // Update ad set status
 router.put('/adsets/:adset_id/status', authenticate, requireRoles('USER', 'ADMIN'), async (req: AuthRequest, res: Response) => {
   try {
-    const { agent_id } = req.query;
+    const { agent_id, account_id } = req.query;
     const { adset_id } = req.params;
     const { status } = req.body;
     
@@ -285,7 +336,7 @@ router.put('/adsets/:adset_id/status', authenticate, requireRoles('USER', 'ADMIN
       return res.status(400).json({ detail: 'Invalid status. Must be ACTIVE, PAUSED, or ARCHIVED' });
     }
     
-    const data = await updateAgentMetaData(agent_id, `adsets/${adset_id}/status`, { status });
+    const data = await updateAgentMetaData(agent_id, `adsets/${adset_id}/status`, { status }, queryAccountId(account_id));
     console.log('Update ad set status response:', data);
     res.json(data);
   } catch (error: any) {
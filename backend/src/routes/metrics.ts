@@ -1,7 +1,7 @@
 import { Router, Request, Response } from 'express';
 import { body, validationResult } from 'express-validator';
-import { MetricSnapshot, AdAccount, Campaign, AdSet, Ad } from '../models';
-import { generateId } from '../utils';
+import { MetricSnapshot, DailyMetric, AdAccount, Campaign, AdSet, Ad } from '../models';
+import { generateId, dailyMetricId } from '../utils';
 
 const router = Router();
 
@@ -81,5 +81,108 @@ router.post('/metrics', [
   }
 });
 
+// Ingest daily roll-ups pre-aggregated by the agent
+router.post('/metrics/rollups', [
+  body('ad_account_id').notEmpty(),
+  body('scope').isIn(['AD', 'AD_SET', 'CAMPAIGN']),
+  body('items').isArray(),
+  body('items.*.meta_id').notEmpty(),
+  body('items.*.date').isISO8601(),
+  body('items.*.impressions').optional().isInt({ min: 0 }).toInt(),
+  body('items.*.clicks').optional().isInt({ min: 0 }).toInt(),
+  body('items.*.spend_minor').optional().isInt({ min: 0 }).toInt(),
+  body('items.*.conversions').optional().isInt({ min: 0 }).toInt(),
+], async (req: Request, res: Response) => {
+  try {
+    const errors = validationResult(req);
+    if (!errors.isEmpty()) {
+      return res.status(400).json({ errors: errors.array() });
+    }
+
+    const { ad_account_id, scope, items } = req.body;
+
+    const account = await AdAccount.findOne({ id: ad_account_id });
+    if (!account) {
+      return res.status(404).json({ detail: 'Ad account not found' });
+    }
+
+    if (items.length === 0) {
+      return res.json({ ok: true, upserted: 0 });
+    }
+
+    const entityMap: Record<string, any> = {
+      AD: Ad,
+      AD_SET: AdSet,
+      CAMPAIGN: Campaign,
+    };
+    const refPrefix: Record<string, string> = {
+      AD: 'ad',
+      AD_SET: 'ad_set',
+      CAMPAIGN: 'campaign',
+    };
+    const modelClass = entityMap[scope];
+
+    // Resolve all referenced entities in one query, creating minimal records for unknown ones
+    const metaIds: string[] = Array.from(new Set(items.map((item: any) => String(item.meta_id))));
+    const existing = await modelClass.find({ meta_id: { $in: metaIds }, ad_account_id: account.id });
+    const refIds = new Map<string, string>(existing.map((ref: any) => [ref.meta_id, ref.id]));
+
+    const missing = metaIds.filter(metaId => !refIds.has(metaId));
+    if (missing.length > 0) {
+      const created = missing.map(metaId => ({
+        id: `${refPrefix[scope]}_${metaId}`,
+        user_id: account.user_id,
+        ad_account_id: account.id,
+        meta_id: metaId,
+        name: metaId,
+        status: 'UNKNOWN',
+      }));
+      await modelClass.insertMany(created);
+      for (const ref of created) {
+        refIds.set(ref.meta_id, ref.id);
+      }
+    }
+
+    // Roll-ups carry absolute per-day totals, so re-sending a day overwrites it
+    const operations = items.map((item: any) => {
+      const refId = refIds.get(String(item.meta_id));
+      const date = new Date(`${String(item.date).split('T')[0]}T00:00:00.000Z`);
+      const campaignId = scope === 'CAMPAIGN' ? refId : undefined;
+      const adSetId = scope === 'AD_SET' ? refId : undefined;
+      const adId = scope === 'AD' ? refId : undefined;
+      const dailyId = dailyMetricId(account.user_id, account.id, date, campaignId, adSetId, adId);
+
+      return {
+        updateOne: {
+          filter: { id: dailyId },
+          update: {
+            $set: {
+              id: dailyId,
+              user_id: account.user_id,
+              ad_account_id: account.id,
+              campaign_id: campaignId,
+              ad_set_id: adSetId,
+              ad_id: adId,
+              date,
+              impressions: item.impressions || 0,
+              clicks: item.clicks || 0,
+              spend_minor: item.spend_minor || 0,
+              conversions: item.conversions || 0,
+            },
+          },
+          upsert: true,
+        },
+      };
+    });
+
+    await DailyMetric.bulkWrite(operations, { ordered: false });
+
+    res.json({ ok: true, upserted: operations.length });
+  } catch (error) {
+    console.error('Ingest rollups error:', error);
+    res.status(500).json({ detail: 'Internal server error' });
+  }
+});
+
 export default router;
 
@@ -1,5 +1,6 @@
 import cron from 'node-cron';
 import { MetricSnapshot, DailyMetric, Agent } from '../models';
+import { dailyMetricId } from '../utils';
 
 const RETENTION_DAYS = 90;
 
@@ -51,7 +52,7 @@ async function aggregateOldSnapshots() {
 
     // Upsert daily metrics
     for (const [key, data] of grouped) {
-      const dailyId = `dm_${data.user_id}_${data.ad_account_id}_${data.date.toISOString().split('T')[0]}_${data.campaign_id || '0'}_${data.ad_set_id || '0'}_${data.ad_id || '0'}`;
+      const dailyId = dailyMetricId(data.user_id, data.ad_account_id, data.date, data.campaign_id, data.ad_set_id, data.ad_id);
 
       await DailyMetric.findOneAndUpdate(
         { id: dailyId },
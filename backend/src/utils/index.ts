@@ -4,3 +4,14 @@ export const generateId = (prefix: string): string => {
   return `${prefix}_${crypto.randomBytes(8).toString('base64url')}`;
 };
 
+
+export const dailyMetricId = (
+  userId: string,
+  adAccountId: string,
+  date: Date,
+  campaignId?: string,
+  adSetId?: string,
+  adId?: string
+): string => {
+  return `dm_${userId}_${adAccountId}_${date.toISOString().split('T')[0]}_${campaignId || '0'}_${adSetId || '0'}_${adId || '0'}`;
+};